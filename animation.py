@@ -0,0 +1,37 @@
+class Animation:
+    def __init__(self, length, speed) -> None:
+        self.length = length
+        self.speed = speed
+        self.index = 0
+
+    @property
+    def frame(self):
+        # the owner may have switched to a shorter set of frames
+        if self.index >= self.length:
+            self.index = 0
+        return int(self.index)
+
+    def advance(self, dt):
+        self.index += self.speed * dt
+        if self.index >= self.length:
+            self.index = 0
+
+    def restart(self):
+        self.index = 0
+
+
+class AnimationClock:
+    def __init__(self) -> None:
+        self.animations = []
+
+    def add(self, length, speed):
+        animation = Animation(length, speed)
+        self.animations.append(animation)
+        return animation
+
+    def remove(self, animation):
+        self.animations.remove(animation)
+
+    def update(self, dt):
+        for animation in self.animations:
+            animation.advance(dt)
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pygame
+
+from support import assets
+
+
+class Effect:
+    def __init__(self, sound, channels, cooldown) -> None:
+        self.sound = sound
+        self.channels = channels
+        self.cooldown = cooldown
+        self.last_played = None
+
+
+class SoundBank:
+    def __init__(self, effects, clock, enabled=True) -> None:
+        # cooldowns run on the level clock, in milliseconds
+        self.clock = clock
+        self.enabled = enabled
+        self.effects = {}
+        if enabled:
+            self.load(effects)
+
+    def load(self, effects):
+        # every effect owns reserved channels, so effects never steal each other's
+        reserved = sum(limit for _, _, limit, _ in effects.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), reserved))
+        pygame.mixer.set_reserved(reserved)
+
+        first = 0
+        for name, (file, volume, limit, cooldown) in effects.items():
+            sound = assets.sound(Path('assets', 'audio', file))
+            sound.set_volume(volume)
+            channels = [pygame.mixer.Channel(first + i) for i in range(limit)]
+            self.effects[name] = Effect(sound, channels, cooldown)
+            first += limit
+
+    def play(self, name):
+        if not self.enabled:
+            return
+        effect = self.effects[name]
+        now = self.clock()
+        if (
+            effect.last_played is not None
+            and now - effect.last_played < effect.cooldown * 1000
+        ):
+            return
+
+        # at the concurrency limit the play is dropped instead of stacking
+        for channel in effect.channels:
+            if not channel.get_busy():
+                channel.play(effect.sound)
+                effect.last_played = now
+                return
+
+
+def play_music(path, volume):
+    # streamed from disk instead of decoded into memory up front
+    pygame.mixer.music.load(path)
+    pygame.mixer.music.set_volume(volume)
+    pygame.mixer.music.play(loops=-1)
@@ -0,0 +1,52 @@
+import json
+from pathlib import Path
+
+import pygame
+
+from settings import ATLAS_SIZE
+from support import ATLAS_INDEX, folder_stamp, pack_pages
+
+# frame folders loaded through import_folder, packed into the atlas pages
+GRAPHICS = Path('assets', 'graphics')
+FOLDERS = [
+    *sorted((GRAPHICS / 'character').iterdir()),
+    *sorted(path for path in (GRAPHICS / 'fruit').iterdir() if path.is_dir()),
+    GRAPHICS / 'rain' / 'drops',
+    GRAPHICS / 'rain' / 'floor',
+    GRAPHICS / 'soil',
+    GRAPHICS / 'soil_water',
+    GRAPHICS / 'water',
+]
+
+
+def build():
+    frames = [
+        ((folder.as_posix(), file.stem), pygame.image.load(file))
+        for folder in FOLDERS
+        for file in sorted(folder.iterdir())
+    ]
+
+    ATLAS_INDEX.parent.mkdir(exist_ok=True)
+    index = {
+        'pages': [],
+        'folders': {folder.as_posix(): [] for folder in FOLDERS},
+        'sources': {folder.as_posix(): folder_stamp(folder) for folder in FOLDERS},
+    }
+    placed = {}
+    for number, (atlas, rects) in enumerate(pack_pages(frames, ATLAS_SIZE)):
+        for key, rect in rects.items():
+            placed[key] = [number, *rect]
+
+        name = f'{number}.png'
+        pygame.image.save(atlas, ATLAS_INDEX.parent / name)
+        index['pages'].append(name)
+
+    # entries keep the sorted file order import_folder relies on
+    for (folder, stem), _ in frames:
+        index['folders'][folder].append([stem, *placed[folder, stem]])
+    ATLAS_INDEX.write_text(json.dumps(index, separators=(',', ':')))
+    print(f'packed {len(frames)} frames into {len(index["pages"])} pages')
+
+
+if __name__ == '__main__':
+    build()
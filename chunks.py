@@ -0,0 +1,59 @@
+import pygame
+
+from settings import CHUNK_SIZE, TILE_SIZE
+from sprites import Animated, Generic
+
+
+def _chunk_key(rect):
+    return rect.x // CHUNK_SIZE, rect.y // CHUNK_SIZE
+
+
+def _row_key(rect):
+    # every tile in a strip shares its top and height, so the strip
+    # keeps the centery the tiles were y-sorted by
+    return rect.x // CHUNK_SIZE, rect.top, rect.height
+
+
+def _batches(tiles, key):
+    batches = {}
+    for x, y, surf in tiles:
+        rect = surf.get_rect(topleft=(x * TILE_SIZE, y * TILE_SIZE))
+        batches.setdefault(key(rect), []).append((surf, rect))
+
+    for batch in batches.values():
+        bounds = batch[0][1].unionall([rect for _, rect in batch])
+        yield bounds, [(tile, rect.move(-bounds.x, -bounds.y)) for tile, rect in batch]
+
+
+def _composite(size, blits):
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    surf.blits(blits, doreturn=False)
+    return surf.convert_alpha()
+
+
+def bake_chunks(tiles, groups, z):
+    for bounds, blits in _batches(tiles, _chunk_key):
+        Generic(bounds.topleft, _composite(bounds.size, blits), groups, z)
+
+
+def bake_rows(tiles, groups, z):
+    for bounds, blits in _batches(tiles, _row_key):
+        Generic(bounds.topleft, _composite(bounds.size, blits), groups, z)
+
+
+def bake_animated_chunks(tiles, frames, animation, groups, z):
+    # each chunk gets the whole tile region pre-tiled once per frame
+    for bounds, blits in _batches(tiles, _chunk_key):
+        chunk_frames = [
+            _composite(bounds.size, [(frame, rect) for _, rect in blits])
+            for frame in frames
+        ]
+        Animated(bounds.topleft, chunk_frames, animation, groups, z)
+
+
+def split_chunks(surf, groups, z):
+    width, height = surf.get_size()
+    for top in range(0, height, CHUNK_SIZE):
+        for left in range(0, width, CHUNK_SIZE):
+            rect = pygame.Rect(left, top, CHUNK_SIZE, CHUNK_SIZE).clip(surf.get_rect())
+            Generic(rect.topleft, surf.subsurface(rect), groups, z)
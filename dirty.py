@@ -0,0 +1,44 @@
+import pygame
+
+from settings import DIRTY_RECTS_LIMIT, SCREEN_HEIGHT, SCREEN_WIDTH
+
+
+class DirtyRects:
+    def __init__(self) -> None:
+        self.screen = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.rects = []
+        self.regions = [self.screen]
+        self.full = True
+
+    def add(self, rect):
+        if not self.full:
+            self.rects.append(pygame.Rect(rect))
+
+    def invalidate(self):
+        self.full = True
+
+    def merge(self):
+        merged = []
+        for rect in self.rects:
+            rect = rect.clip(self.screen)
+            if not rect:
+                continue
+            # touching rects are merged as well, so tile rows become one region
+            while (index := rect.inflate(2, 2).collidelist(merged)) != -1:
+                rect.union_ip(merged.pop(index))
+            merged.append(rect)
+        return merged
+
+    def collect(self):
+        self.regions = [self.screen] if self.full else self.merge()
+        if len(self.regions) > DIRTY_RECTS_LIMIT:
+            self.regions = [self.screen]
+        self.rects = []
+        self.full = False
+        return self.regions
+
+    def present(self):
+        if self.regions == [self.screen]:
+            pygame.display.update()
+        elif self.regions:
+            pygame.display.update(self.regions)
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pygame
+
+from settings import PROFILE_REFRESH
+
+
+class Hud:
+    def __init__(self, profiler, groups) -> None:
+        self.profiler = profiler
+        self.groups = groups
+        self.font = pygame.font.Font(Path('assets', 'font', 'LycheeSoda.ttf'), 20)
+        self.area = pygame.Rect(10, 10, 220, 0)
+        self.surf = None
+        self.built = None
+        self.shown = False
+        self.toggled = False
+
+    def toggle(self):
+        self.shown = not self.shown
+        self.toggled = True
+        self.profiler.watch(self.shown)
+        self.surf = None
+
+    def changed(self):
+        # the covered area has to be redrawn while shown and once after hiding
+        toggled, self.toggled = self.toggled, False
+        return self.shown or toggled
+
+    def build(self):
+        rows = [
+            (name, f'{elapsed * 1000:.2f} ms')
+            for name, elapsed in self.profiler.averages().items()
+        ]
+        rows += [(name, str(len(group))) for name, group in self.groups.items()]
+
+        height = self.font.get_linesize()
+        self.surf = pygame.Surface(
+            (self.area.width, height * len(rows) + 10), pygame.SRCALPHA
+        )
+        self.surf.fill((0, 0, 0, 160))
+        for row, (name, value) in enumerate(rows):
+            top = 5 + row * height
+            self.surf.blit(self.font.render(name, False, 'White'), (5, top))
+            value = self.font.render(value, False, 'White')
+            self.surf.blit(value, value.get_rect(topright=(self.area.width - 5, top)))
+        # a shrinking panel still clears what it covered before
+        self.area.height = max(self.area.height, self.surf.get_height())
+        self.built = self.profiler.count
+
+    def display(self, queue):
+        if self.surf is None or self.profiler.count - self.built >= PROFILE_REFRESH:
+            self.build()
+        queue.append(self.surf, self.area.topleft)
@@ -1,74 +1,140 @@
+from bisect import insort
+from itertools import count
 from pathlib import Path
 import random
 from typing import Sequence, Union
 
 import pygame
 from pygame.sprite import Group, Sprite
-from pytmx.util_pygame import load_pygame
 
+from animation import AnimationClock
+from audio import SoundBank, play_music
+from chunks import bake_animated_chunks, bake_chunks, bake_rows, split_chunks
+from dirty import DirtyRects
+from hud import Hud
+from mapcache import load_map
 from menu import Menu
 from overlay import Overlay
 from player import Player
-from settings import LAYERS, SCREEN_HEIGHT, SCREEN_WIDTH, TILE_SIZE, TMX_LAYERS
+from profiling import Profiler
+from recording import KeyState
+from render import RenderQueue
+from settings import (
+    CAMERA_CELL_SIZE,
+    COLLISION_CELL_SIZE,
+    DIRTY_RECTS,
+    LAYERS,
+    MUSIC_VOLUME,
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    SOUND_EFFECTS,
+    TILE_HITBOX,
+    TILE_SIZE,
+    TMX_LAYERS,
+)
 from sky import Rain, Sky
 from soil import SoilLayer
-from sprites import Generic, Interaction, Particle, Tree, Water
-from support import import_folder
+from spatial import DepthColumns, SpatialGrid, TileIndex, TileMask
+from sprites import Generic, Interaction, ParticlePool, Tree
+from support import assets, import_folder
+from timer import ManualClock, Scheduler
+from tint import Tint
 from transition import Transition
 
+MAP = Path('assets', 'data', 'map.tmx')
+MUSIC = Path('assets', 'audio', 'music.mp3')
+NO_KEYS = KeyState()
+
 
 class Level:
-    def __init__(self):
+    def __init__(self, seed=None, headless=False, loading=None):
+        # one seeded generator feeds every random draw in the level
+        self.rng = random.Random(seed)
+        self.headless = headless
+        # told how far the build is between stages, keeps a loading screen live
+        self.loading = loading or (lambda done: None)
+        self.profiler = Profiler()
         self.display_surface = pygame.display.get_surface()
+        self.queue = RenderQueue(self.display_surface)
+
+        tmx_data = load_map(MAP)
+        self.loading(0.2)
 
         self.all_sprites = CameraGroup()
-        self.collision_sprites = pygame.sprite.Group()
+        self.collision_sprites = CollisionGroup(
+            TileMask(tmx_data.width, tmx_data.height, TILE_SIZE, TILE_HITBOX)
+        )
         self.tree_sprites = pygame.sprite.Group()
         self.interaction_sprites = pygame.sprite.Group()
+        self.tile_index = TileIndex(TILE_SIZE)
+        self.animations = AnimationClock()
+        # timers run on simulation time, so they replay the same at any speed
+        self.clock = ManualClock()
+        self.scheduler = Scheduler(self.clock)
+        self.particles = ParticlePool(self.all_sprites, self.scheduler)
 
-        tmx_data = load_pygame(Path('assets', 'data', 'map.tmx'))
-        ground_surf = pygame.image.load(
-            Path('assets', 'graphics', 'world', 'ground.png')
-        ).convert_alpha()
-        self.soil_layer = SoilLayer(self.all_sprites, tmx_data)
+        ground_surf = assets.image(Path('assets', 'graphics', 'world', 'ground.png'))
+        self.sounds = SoundBank(SOUND_EFFECTS, self.clock, enabled=not headless)
+        self.soil_layer = SoilLayer(
+            self.all_sprites, self.tile_index, tmx_data, self.sounds, self.rng
+        )
+        self.loading(0.35)
         self.setup(tmx_data, ground_surf)
         self.overlay = Overlay(self.player)
-        self.transition = Transition(self.reset, self.player)
-        self.rain = Rain(self.all_sprites, ground_surf)
-        self.raining = random.randint(0, 5) == 0
+        self.tint = Tint()
+        self.transition = Transition(self.reset, self.player, self.tint)
+        self.rain = Rain(self.all_sprites, ground_surf, self.rng)
+        self.raining = self.rng.randint(0, 5) == 0
         self.soil_layer.raining = self.raining
-        self.sky = Sky()
+        self.sky = Sky(self.tint)
+        self.loading(0.95)
+
+        # dirty rect rendering
+        self.dirty = DirtyRects() if DIRTY_RECTS else None
+        if self.dirty:
+            self.all_sprites.marks = []
+        self.shown = None
 
         # shop
         self.menu = Menu(self.player, self.toggle_shop)
         self.shop_active = False
 
-        # sounds
-        self.success = pygame.mixer.Sound(Path('assets', 'audio', 'success.wav'))
-        self.success.set_volume(0.2)
-        self.main_music = pygame.mixer.Sound(Path('assets', 'audio', 'music.mp3'))
-        self.main_music.set_volume(0.2)
-        self.main_music.play(loops=-1)
+        # profiling readout, sprite counts come from every group
+        self.hud = Hud(
+            self.profiler,
+            {
+                'sprites': self.all_sprites,
+                'collision': self.collision_sprites,
+                'trees': self.tree_sprites,
+                'interaction': self.interaction_sprites,
+                'soil': self.soil_layer.soil_tiles,
+                'plants': self.soil_layer.plant_sprites,
+                'particles': self.particles.live,
+            },
+        )
+
+        if not headless:
+            play_music(MUSIC, MUSIC_VOLUME)
+        self.loading(1)
 
     def setup(self, tmx_data, ground_surf):
-        Generic((0, 0), ground_surf, self.all_sprites, LAYERS['ground'])
+        split_chunks(ground_surf, self.all_sprites, LAYERS['ground'])
 
         for tmx, layers in TMX_LAYERS.items():
-            for layer in layers:
-                for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-                    Generic(
-                        (x * TILE_SIZE, y * TILE_SIZE),
-                        surf,
-                        self.all_sprites,
-                        LAYERS[tmx],
-                    )
-
-        for x, y, surf in tmx_data.get_layer_by_name('Fence').tiles():
-            Generic(
-                (x * TILE_SIZE, y * TILE_SIZE),
-                surf,
-                [self.all_sprites, self.collision_sprites],
-            )
+            tiles = [
+                tile
+                for layer in layers
+                for tile in tmx_data.get_layer_by_name(layer).tiles()
+            ]
+            # tiles on the main layer have to keep y-sorting with the player
+            bake = bake_rows if LAYERS[tmx] == LAYERS['main'] else bake_chunks
+            bake(tiles, self.all_sprites, LAYERS[tmx])
+        self.loading(0.5)
+
+        fence_tiles = list(tmx_data.get_layer_by_name('Fence').tiles())
+        bake_rows(fence_tiles, self.all_sprites, LAYERS['main'])
+        for x, y, _ in fence_tiles:
+            self.collision_sprites.tiles.add(x, y)
 
         for obj in tmx_data.get_layer_by_name('Decoration'):
             Generic(
@@ -76,28 +142,32 @@ class Level:
             )
 
         for obj in tmx_data.get_layer_by_name('Trees'):
-            Tree(
+            tree = Tree(
                 (obj.x, obj.y),
                 obj.image,
                 [self.all_sprites, self.collision_sprites, self.tree_sprites],
                 obj.name,
                 player_add=self.player_add,
+                particles=self.particles,
+                sounds=self.sounds,
+                rng=self.rng,
             )
+            # a stump sits inside the rect of the tree it replaces
+            self.tile_index.add('tree', tree)
+        self.loading(0.6)
 
         water_frames = import_folder(Path('assets', 'graphics', 'water'))
-        for x, y, surf in tmx_data.get_layer_by_name('Water').tiles():
-            Water(
-                (x * TILE_SIZE, y * TILE_SIZE),
-                water_frames,
-                self.all_sprites,
-            )
+        bake_animated_chunks(
+            tmx_data.get_layer_by_name('Water').tiles(),
+            water_frames,
+            self.animations.add(len(water_frames), 5),
+            self.all_sprites,
+            LAYERS['water'],
+        )
+        self.loading(0.75)
 
-        for x, y, surf in tmx_data.get_layer_by_name('Collision').tiles():
-            Generic(
-                (x * TILE_SIZE, y * TILE_SIZE),
-                pygame.Surface((TILE_SIZE, TILE_SIZE)),
-                self.collision_sprites,
-            )
+        for x, y, _ in tmx_data.get_layer_by_name('Collision').tiles():
+            self.collision_sprites.tiles.add(x, y)
 
         for obj in tmx_data.get_layer_by_name('Player'):
             if obj.name == 'Start':
@@ -105,10 +175,11 @@ class Level:
                     (obj.x, obj.y),
                     self.all_sprites,
                     self.collision_sprites,
-                    self.tree_sprites,
-                    self.interaction_sprites,
+                    self.tile_index,
                     self.soil_layer,
                     self.toggle_shop,
+                    self.animations,
+                    self.scheduler,
                 )
             elif obj.name == 'Bed':
                 Interaction(
@@ -124,19 +195,21 @@ class Level:
                     self.interaction_sprites,
                     obj.name,
                 )
+        for interaction in self.interaction_sprites:
+            self.tile_index.add('interaction', interaction)
 
     def player_add(self, item):
         self.player.item_inventory[item] += 1
-        self.success.play()
+        self.sounds.play('success')
 
     def toggle_shop(self):
         self.shop_active = not self.shop_active
 
     def reset(self):
-        self.sky.start_color = [255, 255, 255]
+        self.sky.reset()
         self.soil_layer.update_plants()
 
-        self.raining = random.randint(0, 5) == 0
+        self.raining = self.rng.randint(0, 5) == 0
         self.soil_layer.raining = self.raining
         if self.raining:
             self.soil_layer.water_all()
@@ -149,52 +222,295 @@ class Level:
             tree.create_fruit()
 
     def plant_collision(self):
-        for plant in self.soil_layer.plant_sprites.sprites():
-            if plant.harvestable and plant.rect.colliderect(self.player.hitbox):
-                self.player_add(plant.plant_type)
-                plant.kill()
-                Particle(
-                    plant.rect.topleft, plant.image, self.all_sprites, LAYERS['main']
-                )
-                self.soil_layer.grid[plant.rect.centery // TILE_SIZE][
-                    plant.rect.centerx // TILE_SIZE
-                ].remove('P')
+        for plant_type, image, rect in self.soil_layer.harvest(self.player.hitbox):
+            self.player_add(plant_type)
+            self.particles.spawn(rect.topleft, image, LAYERS['main'])
+
+    def run(self, dt, events, keys=NO_KEYS):
+        self.update(dt, events, keys)
+        self.render()
 
-    def run(self, dt, events):
-        # drawing logic
-        self.all_sprites.custom_draw(self.player)
+    def update(self, dt, events, keys=NO_KEYS):
+        stage = self.profiler.stage
+        # where the player was before this step, for interpolated rendering
+        self.player.previous.update(self.player.rect.center)
+        self.player.keys = keys
+        self.clock.advance(dt * 1000)
 
-        # updates
         if self.shop_active:
-            self.menu.update(events)
+            with stage('menu'):
+                self.menu.update(events)
         else:
-            self.all_sprites.update(dt, events)
-            self.plant_collision()
+            with stage('timers'):
+                self.scheduler.update()
+                self.animations.update(dt)
+            with stage('sprites'):
+                self.all_sprites.update(dt, events)
+            with stage('harvest'):
+                self.plant_collision()
 
         # weather
-        self.overlay.display()
+        if not self.shop_active:
+            with stage('rain'):
+                self.rain.update(dt, self.raining)
+        with stage('sky'):
+            self.sky.update(dt)
 
-        if self.raining and not self.shop_active:
-            self.rain.update()
-        self.sky.display(dt)
+        if self.player.sleep:
+            with stage('transition'):
+                self.transition.update(dt)
+
+    def render(self, alpha=1):
+        # alpha is how far the frame lies between the last two simulation steps
+        with self.profiler.stage('camera'):
+            self.soil_layer.show(self.all_sprites.view)
+            moved = self.all_sprites.follow(self.player, alpha)
+            if self.dirty:
+                self.mark_dirty(moved)
+                areas = self.dirty.collect()
+            else:
+                areas = [self.display_surface.get_rect()]
+
+        for area in areas:
+            self.display_surface.set_clip(area)
+            self.draw(area)
+        self.display_surface.set_clip(None)
+
+    def mark_dirty(self, moved):
+        # screen wide changes fall back to a full redraw
+        state = (self.shop_active, self.player.sleep)
+        if (
+            moved
+            or self.sky.changed
+            or self.player.sleep
+            or self.rain.active
+            or state != self.shown
+        ):
+            self.dirty.invalidate()
+        self.shown = state
+
+        for rect in self.all_sprites.take_marks():
+            self.dirty.add(rect)
+        if self.overlay.changed():
+            self.dirty.add(self.overlay.area)
+        if self.hud.changed():
+            self.dirty.add(self.hud.area)
+        if self.shop_active and self.menu.changed:
+            self.menu.changed = False
+            self.dirty.add(self.menu.main_rect)
+            self.dirty.add(self.menu.money_area)
 
+    def draw(self, area):
+        stage = self.profiler.stage
+        with stage('scene draw'):
+            self.all_sprites.custom_draw(area, self.queue)
+        if self.shop_active:
+            # the menu draws shapes, so the scene has to land first
+            with stage('blit'):
+                self.queue.flush()
+            with stage('menu draw'):
+                self.menu.display()
+        with stage('overlay draw'):
+            self.overlay.display(self.queue)
+        with stage('sky draw'):
+            self.sky.display()
         if self.player.sleep:
-            self.transition.play(dt)
+            with stage('transition draw'):
+                self.transition.display()
+        with stage('tint draw'):
+            self.tint.display(self.queue)
+        if self.hud.shown:
+            with stage('hud draw'):
+                self.hud.display(self.queue)
+        with stage('blit'):
+            self.queue.flush()
+
+    def present(self):
+        if self.headless:
+            return
+        if self.dirty:
+            self.dirty.present()
+        else:
+            pygame.display.update()
 
 
 class CameraGroup(Group):
     def __init__(self, *sprites: Union[Sprite, Sequence[Sprite]]) -> None:
-        super().__init__(*sprites)
-        self.display_surface = pygame.display.get_surface()
         self.offset = pygame.math.Vector2()
+        self.shift = (None, 0, 0)
+        self.view = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+        # depth ordered render list
+        self.buckets = {}
+        self.depths = []
+        self.layers = {}
+        self.placed = {}
+        self.pending = set()
+        self.moving = set()
+        self.order = {}
+        self.counter = count()
 
-    def custom_draw(self, player):
-        self.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
-        self.offset.y = player.rect.centery - SCREEN_HEIGHT / 2
+        # dirty rect tracking, world space
+        self.marks = None
+        self.shown = {}
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        # sprites join their groups before their rect exists
+        self.pending.add(sprite)
+        self.order[sprite] = next(self.counter)
+        if type(sprite).update is not Sprite.update:
+            self.moving.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self.pending:
+            self.pending.remove(sprite)
+        else:
+            self.unplace(sprite)
+            if self.marks is not None:
+                shown = self.shown.pop(sprite, None)
+                self.marks.append(shown[0] if shown else sprite.rect.copy())
+        del self.order[sprite]
+        self.moving.discard(sprite)
+
+    def place(self, sprite):
+        if sprite.z not in self.buckets:
+            self.buckets[sprite.z] = DepthColumns(CAMERA_CELL_SIZE)
+            if sprite.z not in self.layers:
+                insort(self.depths, sprite.z)
+        layer = self.buckets[sprite.z]
+        column = layer.column(sprite.rect)
+        key = (sprite.rect.centery, self.order[sprite])
+        layer.insert(sprite, column, key, sprite.rect)
+        self.placed[sprite] = (sprite.z, column, key)
+
+    def add_layer(self, z, draw):
+        # draw(view, offset, append) runs after the sprites at depth z
+        if z not in self.buckets:
+            insort(self.depths, z)
+        self.layers[z] = draw
+
+    def unplace(self, sprite):
+        z, column, key = self.placed.pop(sprite)
+        self.buckets[z].remove(column, key)
 
-        for sprite in sorted(
-            self.sprites(), key=lambda sprite: (sprite.z, sprite.rect.centery)
+    def refresh(self, sprite):
+        if sprite in self.pending:
+            return
+        z, column, (centery, _) = self.placed[sprite]
+        if (
+            sprite.z != z
+            or sprite.rect.centery != centery
+            or self.buckets[z].column(sprite.rect) != column
         ):
-            offset_rect = sprite.rect.copy()
-            offset_rect.center -= self.offset
-            self.display_surface.blit(sprite.image, offset_rect)
+            self.unplace(sprite)
+            self.place(sprite)
+
+    def track(self, sprite):
+        shown = self.shown.get(sprite)
+        if shown:
+            rect, image = shown
+            if image is sprite.image and rect == sprite.rect:
+                return
+            self.marks.append(rect)
+        rect = sprite.rect.copy()
+        self.marks.append(rect)
+        if sprite in self.moving:
+            self.shown[sprite] = (rect, sprite.image)
+
+    def take_marks(self):
+        offset_x, offset_y = self.view.topleft
+        marks = [rect.move(-offset_x, -offset_y) for rect in self.marks]
+        self.marks.clear()
+        return marks
+
+    def place_pending(self):
+        for sprite in self.pending:
+            self.place(sprite)
+            if self.marks is not None:
+                self.track(sprite)
+        self.pending.clear()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.place_pending()
+        for sprite in self.moving:
+            self.refresh(sprite)
+            if self.marks is not None:
+                self.track(sprite)
+
+    def follow(self, player, alpha=1):
+        center = player.previous.lerp(player.rect.center, alpha)
+        self.offset.x = center.x - SCREEN_WIDTH / 2
+        self.offset.y = center.y - SCREEN_HEIGHT / 2
+        self.place_pending()
+
+        # the player is drawn where the camera thinks it is
+        self.shift = (
+            player,
+            round(center.x) - player.rect.centerx,
+            round(center.y) - player.rect.centery,
+        )
+
+        topleft = self.view.topleft
+        self.view.topleft = int(self.offset.x), int(self.offset.y)
+        return self.view.topleft != topleft
+
+    def custom_draw(self, area, queue):
+        offset_x, offset_y = self.view.topleft
+        view = area.move(offset_x, offset_y)
+        append = queue.items.append
+        shifted, shift_x, shift_y = self.shift
+
+        for z in self.depths:
+            if z in self.buckets:
+                for sprite in self.buckets[z].query(view):
+                    rect = sprite.rect
+                    if sprite is shifted:
+                        rect = rect.move(shift_x, shift_y)
+                    if rect.colliderect(view):
+                        append((sprite.image, (rect.x - offset_x, rect.y - offset_y)))
+            if z in self.layers:
+                self.layers[z](view, (offset_x, offset_y), append)
+
+
+class CollisionGroup(Group):
+    def __init__(self, tiles, *sprites: Union[Sprite, Sequence[Sprite]]) -> None:
+        # tile aligned blockers live in a bitmap, irregular ones in the grid
+        self.tiles = tiles
+        self.grid = SpatialGrid(COLLISION_CELL_SIZE)
+        self.pending = set()
+        self.order = {}
+        self.counter = count()
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        # sprites join their groups before their hitbox exists
+        self.pending.add(sprite)
+        self.order[sprite] = next(self.counter)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self.pending:
+            self.pending.remove(sprite)
+        else:
+            self.grid.remove(sprite)
+        del self.order[sprite]
+
+    def refresh(self, sprite):
+        if sprite not in self.pending:
+            self.grid.move(sprite, sprite.hitbox)
+
+    def query(self, rect):
+        for sprite in self.pending:
+            self.grid.insert(sprite, sprite.hitbox)
+        self.pending.clear()
+        return sorted(self.grid.query(rect), key=self.order.__getitem__)
+
+    def hitboxes(self, rect):
+        yield from self.tiles.hitboxes(rect)
+        for sprite in self.query(rect):
+            yield sprite.hitbox
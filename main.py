@@ -1,33 +1,222 @@
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import os
 from pathlib import Path
+import random
 import sys
+from time import perf_counter
 
 import pygame
 
-from level import Level
-from settings import SCREEN_HEIGHT, SCREEN_WIDTH
+from level import MAP, Level
+from mapcache import compile_map, map_files
+from recording import KeyState, Recorder, read_session
+from settings import (
+    ASSET_REPORT,
+    FRAME_RATE,
+    IDLE_FRAME_RATE,
+    LOADER_THREADS,
+    MAX_FRAME_TIME,
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    SIMULATION_DAY,
+    SIMULATION_RATE,
+)
+from support import SOUND_SUFFIXES, assets
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, headless=False):
+        if headless:
+            # no window and no sound device, nothing is presented or played
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        self.headless = headless
         pygame.init()
         pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Pydew Valley')
         self.clock = pygame.time.Clock()
-        self.level = Level()
 
-    def run(self):
+        # files decode on loader threads, a stale map cache recompiles there too
+        self.loader = ThreadPoolExecutor(LOADER_THREADS)
+        cached = map_files(MAP)
+        compiling = None if cached else self.loader.submit(compile_map, MAP)
+        startup = assets.startup_files() + cached
+        if headless:
+            startup = [path for path in startup if path.suffix not in SOUND_SUFFIXES]
+        assets.prefetch(startup, self.loader)
+
+        if headless:
+            loading = None
+            if compiling:
+                compiling.result()
+        else:
+            self.show_loading(startup, compiling)
+            # the second half of the bar is the level build on the main thread
+            loading = lambda done: self.draw_loading(0.5 + done / 2)
+
+        self.level = Level(seed, headless, loading)
+        if ASSET_REPORT:
+            print(assets.report())
+
+    def show_loading(self, paths, compiling):
+        screen = pygame.display.get_surface()
+        font = pygame.font.Font(Path('assets', 'font', 'LycheeSoda.ttf'), 30)
+        self.loading_text = font.render('Loading', False, 'White')
+        self.loading_bar = pygame.Rect(0, 0, 400, 20)
+        self.loading_bar.center = screen.get_rect().center
+
+        while True:
+            ready = sum(map(assets.ready, paths))
+            ready += compiling is None or compiling.done()
+            if ready == len(paths) + 1:
+                break
+            self.draw_loading(ready / (len(paths) + 1) / 2)
+            self.clock.tick(30)
+        if compiling:
+            compiling.result()
+
+    def draw_loading(self, progress):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+
+        screen = pygame.display.get_surface()
+        bar = self.loading_bar
+        screen.fill('Black')
+        screen.blit(
+            self.loading_text,
+            self.loading_text.get_rect(midbottom=bar.move(0, -10).midtop),
+        )
+        pygame.draw.rect(screen, 'White', bar.inflate(8, 8), 2)
+        filled = bar.copy()
+        filled.width = bar.width * progress
+        pygame.draw.rect(screen, 'White', filled)
+        pygame.display.update()
+
+    def frame_rate(self, events):
+        if not pygame.key.get_focused() or not pygame.display.get_active():
+            return IDLE_FRAME_RATE
+        if self.level.shop_active and not events:
+            return IDLE_FRAME_RATE
+        return FRAME_RATE
+
+    def run(self, recorder=None):
+        step = 1 / SIMULATION_RATE
+        lag = 0
+        events = []
+        profiler = self.level.profiler
+        stage = profiler.stage
         while True:
-            events = pygame.event.get()
-            for event in events:
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+            with stage('events'):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        if recorder:
+                            recorder.close()
+                        profiler.close()
+                        pygame.quit()
+                        sys.exit()
+                    if event.type == pygame.KEYUP and event.key == pygame.K_F3:
+                        self.level.hud.toggle()
+                    events.append(event)
+
+            with stage('wait'):
+                lag += min(
+                    self.clock.tick(self.frame_rate(events)) / 1000, MAX_FRAME_TIME
+                )
 
-            dt = self.clock.tick() / 1000
-            self.level.run(dt, events)
-            pygame.display.update()
+            # the frame is the work between waits, the wait itself is apart
+            with stage('frame'):
+                keys = KeyState.capture()
+                while lag >= step:
+                    # events are handed to the first step that runs after them
+                    if recorder:
+                        recorder.step(keys, events)
+                    self.level.update(step, events, keys)
+                    events = []
+                    lag -= step
+
+                self.level.render(lag / step)
+                with stage('present'):
+                    self.level.present()
+            profiler.end_frame()
+
+    def replay(self, session):
+        # every recorded step is simulated and rendered as one frame
+        step = 1 / session.rate
+        level = self.level
+        profiler = level.profiler
+        profiler.keep()
+        for keys, events in session.steps:
+            with profiler.stage('frame'):
+                level.update(step, events, keys)
+                level.render()
+            profiler.end_frame()
+        profiler.close()
+        print(profiler.report())
+
+    def simulate(self, days):
+        # whole days of idle play at the fixed step, each ended by going to bed
+        step = 1 / SIMULATION_RATE
+        level = self.level
+        profiler = level.profiler
+
+        def advance():
+            # each step is a frame for the profiler, there is nothing to render
+            with profiler.stage('frame'):
+                level.update(step, [])
+            profiler.end_frame()
+
+        start = perf_counter()
+        steps = 0
+        for day in range(1, days + 1):
+            for _ in range(round(SIMULATION_DAY * SIMULATION_RATE)):
+                advance()
+            level.player.sleep = True
+            while level.player.sleep:
+                advance()
+                steps += 1
+            steps += round(SIMULATION_DAY * SIMULATION_RATE)
+            print(
+                f'day {day}: raining {level.raining}, {len(level.all_sprites)} sprites'
+            )
+
+        seconds = perf_counter() - start
+        profiler.close()
+        print(f'{steps} steps in {seconds:.2f} s, {steps / seconds:.0f} steps/s')
 
 
 if __name__ == '__main__':
-    game = Game()
-    game.run()
+    parser = ArgumentParser()
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--record', type=Path)
+    parser.add_argument('--replay', type=Path)
+    parser.add_argument('--profile-csv', type=Path)
+    args = parser.parse_args()
+
+    if args.replay:
+        session = read_session(args.replay)
+        game = Game(session.seed, headless=True)
+    elif args.headless:
+        game = Game(args.seed, headless=True)
+    elif args.record:
+        # a recording always has a seed, so its replay starts from the same world
+        args.seed = random.randrange(2**32) if args.seed is None else args.seed
+        game = Game(args.seed)
+    else:
+        game = Game(args.seed)
+
+    if args.profile_csv:
+        game.level.profiler.stream(args.profile_csv)
+
+    if args.replay:
+        game.replay(session)
+    elif args.headless:
+        game.simulate(args.days)
+    elif args.record:
+        game.run(Recorder(args.record, args.seed, SIMULATION_RATE))
+    else:
+        game.run()
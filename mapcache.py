@@ -0,0 +1,183 @@
+from io import BytesIO
+import json
+import os
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+
+import numpy as np
+import pygame
+
+from settings import ATLAS_SIZE
+from support import assets, pack_pages
+
+
+class TileLayer:
+    def __init__(self, gids, images) -> None:
+        self.gids = gids
+        self.images = images
+
+    def tiles(self):
+        images = self.images
+        for y, x in zip(*np.nonzero(self.gids)):
+            yield int(x), int(y), images[self.gids[y, x]]
+
+    def mask(self):
+        return self.gids > 0
+
+
+class MapObject:
+    def __init__(self, x, y, width, height, name, image) -> None:
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.name = name
+        self.image = image
+
+
+class CompiledMap:
+    def __init__(self, width, height, layers) -> None:
+        self.width = width
+        self.height = height
+        self.layers = layers
+
+    def get_layer_by_name(self, name):
+        return self.layers[name]
+
+
+def cache_path(tmx_path):
+    return tmx_path.with_suffix('.cache.npz')
+
+
+def page_path(tmx_path, number):
+    return tmx_path.with_suffix(f'.cache.{number}.png')
+
+
+def sources(tmx_path):
+    # the map, its tilesets and every image they reference
+    found = [tmx_path]
+    for tileset in ElementTree.parse(tmx_path).iter('tileset'):
+        if 'source' in tileset.attrib:
+            tsx_path = tmx_path.parent / tileset.attrib['source']
+            found.append(tsx_path)
+            root = ElementTree.parse(tsx_path).getroot()
+        else:
+            tsx_path, root = tmx_path, tileset
+        for image in root.iter('image'):
+            found.append(tsx_path.parent / image.attrib['source'])
+    return [Path(os.path.normpath(path)) for path in found]
+
+
+def stamp(tmx_path):
+    return {path.as_posix(): path.stat().st_mtime_ns for path in sources(tmx_path)}
+
+
+def stale(path):
+    # only stats the recorded sources, the map is parsed again on recompile
+    with np.load(path) as data:
+        recorded = json.loads(str(data['meta']))['sources']
+    for source, mtime in recorded.items():
+        if not os.path.exists(source) or os.stat(source).st_mtime_ns != mtime:
+            return True
+    return False
+
+
+def compile_map(tmx_path):
+    # pytmx is only needed here, the game loads the cache
+    from pytmx import TiledObjectGroup, TiledTileLayer
+    from pytmx.util_pygame import load_pygame
+
+    tmx_data = load_pygame(tmx_path)
+
+    # compact ids for every image the map uses, 0 stays empty
+    ids = {}
+
+    def image_id(gid):
+        if not gid or tmx_data.images[gid] is None:
+            return 0
+        return ids.setdefault(gid, len(ids) + 1)
+
+    arrays = {}
+    layers = []
+    for layer in tmx_data.layers:
+        if isinstance(layer, TiledTileLayer):
+            gids = np.array(
+                [[image_id(gid) for gid in row] for row in layer.data], np.uint16
+            )
+            arrays[f'layer {len(layers)}'] = gids
+            layers.append({'name': layer.name, 'type': 'tiles'})
+        elif isinstance(layer, TiledObjectGroup):
+            objects = [
+                [obj.x, obj.y, obj.width, obj.height, obj.name, image_id(obj.gid)]
+                for obj in layer
+            ]
+            layers.append({'name': layer.name, 'type': 'objects', 'objects': objects})
+
+    rects = np.zeros((len(ids) + 1, 5), np.int32)
+    frames = [(index, tmx_data.images[gid]) for gid, index in ids.items()]
+    pages = pack_pages(frames, ATLAS_SIZE)
+    for number, (atlas, placed) in enumerate(pages):
+        pygame.image.save(atlas, page_path(tmx_path, number))
+        assets.discard(page_path(tmx_path, number))
+        for index, rect in placed.items():
+            rects[index] = (number, *rect)
+
+    meta = {
+        'width': tmx_data.width,
+        'height': tmx_data.height,
+        'pages': len(pages),
+        'layers': layers,
+        'sources': stamp(tmx_path),
+    }
+    with open(cache_path(tmx_path), 'wb') as file:
+        np.savez_compressed(
+            file, meta=np.array(json.dumps(meta)), rects=rects, **arrays
+        )
+    assets.discard(cache_path(tmx_path))
+
+
+def map_files(tmx_path):
+    # the files a fresh cache is loaded from, for prefetching
+    tmx_path = Path(tmx_path)
+    path = cache_path(tmx_path)
+    if not path.exists() or stale(path):
+        return []
+    with np.load(path) as data:
+        pages = json.loads(str(data['meta']))['pages']
+    return [path] + [page_path(tmx_path, number) for number in range(pages)]
+
+
+def load_map(tmx_path):
+    tmx_path = Path(tmx_path)
+    path = cache_path(tmx_path)
+    if not path.exists() or stale(path):
+        compile_map(tmx_path)
+
+    with np.load(BytesIO(assets.read(path))) as data:
+        meta = json.loads(str(data['meta']))
+        rects = data['rects']
+        pages = [assets.image(page_path(tmx_path, n)) for n in range(meta['pages'])]
+        images = [None] + [
+            pages[page].subsurface(x, y, width, height)
+            for page, x, y, width, height in rects[1:].tolist()
+        ]
+
+        layers = {}
+        for number, layer in enumerate(meta['layers']):
+            if layer['type'] == 'tiles':
+                layers[layer['name']] = TileLayer(data[f'layer {number}'], images)
+            else:
+                layers[layer['name']] = [
+                    MapObject(x, y, width, height, name, images[image])
+                    for x, y, width, height, name, image in layer['objects']
+                ]
+
+    return CompiledMap(meta['width'], meta['height'], layers)
+
+
+if __name__ == '__main__':
+    import sys
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    compile_map(Path(sys.argv[1] if len(sys.argv) > 1 else 'assets/data/map.tmx'))
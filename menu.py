@@ -27,6 +27,7 @@ class Menu:
 
         # movement
         self.index = 0
+        self.changed = True
 
         self.setup()
 
@@ -52,6 +53,10 @@ class Menu:
         self.buy_text = self.font.render('buy', False, 'Black')
         self.sell_text = self.font.render('sell', False, 'Black')
 
+        # money box, wide enough for any amount
+        self.money_area = pygame.Rect(0, 0, self.width, self.font.get_height() + 10)
+        self.money_area.midbottom = (SCREEN_WIDTH / 2, SCREEN_HEIGHT - 15)
+
     def display_money(self):
         text_surf = self.font.render(f'${self.player.money}', False, 'Black')
         text_rect = text_surf.get_rect(midbottom=(SCREEN_WIDTH / 2, SCREEN_HEIGHT - 20))
@@ -63,6 +68,7 @@ class Menu:
         for event in events:
             if event.type != pygame.KEYUP:
                 continue
+            self.changed = True
             if event.key == pygame.K_RETURN:
                 self.toggle_menu()
             elif event.key == pygame.K_UP:
@@ -123,6 +129,8 @@ class Menu:
 
     def update(self, events):
         self.input(events)
+
+    def display(self):
         self.display_money()
 
         for text_index, text_surf in enumerate(self.text_surfs):
@@ -1,25 +1,36 @@
 from pathlib import Path
 
-import pygame
-
 from settings import OVERLAY_POSITIONS
+from support import assets
 
 
 class Overlay:
     def __init__(self, player) -> None:
-        self.display_surface = pygame.display.get_surface()
         self.player = player
 
         overlay_path = Path('assets', 'graphics', 'overlay')
-        _load = lambda asset: pygame.image.load(overlay_path / f'{asset}.png').convert_alpha()
+        _load = lambda asset: assets.image(overlay_path / f'{asset}.png')
         self.tools_surf = {tool: _load(tool) for tool in player.tools}
         self.seeds_surf = {seed: _load(seed) for seed in player.seeds}
 
-    def display(self):
+        # screen area covered by any tool or seed icon
+        rects = [surf.get_rect(midbottom = OVERLAY_POSITIONS['tool']) for surf in self.tools_surf.values()]
+        rects += [surf.get_rect(midbottom = OVERLAY_POSITIONS['seed']) for surf in self.seeds_surf.values()]
+        self.area = rects[0].unionall(rects[1:])
+        self.shown = None
+
+    def changed(self):
+        selected = (self.player.selected_tool, self.player.selected_seed)
+        if selected == self.shown:
+            return False
+        self.shown = selected
+        return True
+
+    def display(self, queue):
         tool_surf = self.tools_surf[self.player.selected_tool]
         tool_rect = tool_surf.get_rect(midbottom = OVERLAY_POSITIONS['tool'])
-        self.display_surface.blit(tool_surf, tool_rect)
+        queue.append(tool_surf, tool_rect)
 
         seed_surf = self.seeds_surf[self.player.selected_seed]
         seed_rect = seed_surf.get_rect(midbottom = OVERLAY_POSITIONS['seed'])
-        self.display_surface.blit(seed_surf, seed_rect)
+        queue.append(seed_surf, seed_rect)
@@ -2,6 +2,7 @@ from pathlib import Path
 
 import pygame
 
+from recording import KeyState
 from settings import LAYERS, PLAYER_TOOL_OFFSET
 from support import import_folder
 from timer import Timer
@@ -13,28 +14,32 @@ class Player(pygame.sprite.Sprite):
         pos,
         group,
         collision_sprites,
-        tree_sprites,
-        interaction_sprites,
+        tile_index,
         soil_layer,
         toggle_shop,
+        clock,
+        scheduler,
     ):
         super().__init__(group)
 
         self.import_assets()
         self.status = 'down_idle'
-        self.frame_index = 0
+        self.animation = clock.add(len(self.animations[self.status]), 4)
 
-        self.image = self.animations[self.status][self.frame_index]
+        self.image = self.animations[self.status][self.animation.frame]
         self.rect = self.image.get_rect(center=pos)
         self.z = LAYERS['main']
 
+        # held keys for the current step, set by the level
+        self.keys = KeyState()
         self.direction = pygame.math.Vector2()
         self.pos = pygame.math.Vector2(self.rect.center)
+        self.previous = pygame.math.Vector2(self.rect.center)
         self.speed = 200
 
         self.timers = {
-            'tool_use': Timer(350, self.use_tool),
-            'seed_use': Timer(350, self.use_seed),
+            'tool_use': Timer(350, scheduler, self.use_tool),
+            'seed_use': Timer(350, scheduler, self.use_seed),
         }
 
         self.tools = ['axe', 'water', 'hoe']
@@ -52,8 +57,7 @@ class Player(pygame.sprite.Sprite):
         self.hitbox = self.rect.copy().inflate(-126, -70)
         self.collision_sprites = collision_sprites
 
-        self.tree_sprites = tree_sprites
-        self.interaction_sprites = interaction_sprites
+        self.tile_index = tile_index
         self.sleep = False
         self.soil_layer = soil_layer
         self.toggle_shop = toggle_shop
@@ -62,9 +66,8 @@ class Player(pygame.sprite.Sprite):
         if self.selected_tool == 'hoe':
             self.soil_layer.get_hit(self.target_pos)
         elif self.selected_tool == 'axe':
-            for tree in self.tree_sprites.sprites():
-                if tree.rect.collidepoint(self.target_pos):
-                    tree.damage()
+            for tree in self.tile_index.at('tree', self.target_pos):
+                tree.damage()
         elif self.selected_tool == 'water':
             self.soil_layer.water(self.target_pos)
 
@@ -106,15 +109,13 @@ class Player(pygame.sprite.Sprite):
             full_path = Path('assets', 'graphics', 'character', animation)
             self.animations[animation] = import_folder(full_path)
 
-    def animate(self, dt):
-        self.frame_index += 4 * dt
-        if self.frame_index >= len(self.animations[self.status]):
-            self.frame_index = 0
-
-        self.image = self.animations[self.status][int(self.frame_index)]
+    def animate(self):
+        frames = self.animations[self.status]
+        self.animation.length = len(frames)
+        self.image = frames[self.animation.frame]
 
     def input(self, events):
-        keys = pygame.key.get_pressed()
+        keys = self.keys
 
         if not any(t.active for t in self.timers.values()) and not self.sleep:
             if keys[pygame.K_UP]:
@@ -138,12 +139,12 @@ class Player(pygame.sprite.Sprite):
             if keys[pygame.K_SPACE]:
                 self.timers['tool_use'].activate()
                 self.direction = pygame.math.Vector2()
-                self.frame_index = 0
+                self.animation.restart()
 
             if keys[pygame.K_LCTRL]:
                 self.timers['seed_use'].activate()
                 self.direction = pygame.math.Vector2()
-                self.frame_index = 0
+                self.animation.restart()
 
             for event in events:
                 if event.type != pygame.KEYUP:
@@ -155,8 +156,8 @@ class Player(pygame.sprite.Sprite):
                     self.seed_index = (self.seed_index + 1) % len(self.seeds)
                     self.selected_seed = self.seeds[self.seed_index]
                 elif event.key == pygame.K_RETURN:
-                    collided_interaction_sprite = pygame.sprite.spritecollide(
-                        self, self.interaction_sprites, False
+                    collided_interaction_sprite = self.tile_index.overlapping(
+                        'interaction', self.rect
                     )
                     if collided_interaction_sprite:
                         if (
@@ -172,49 +173,47 @@ class Player(pygame.sprite.Sprite):
             self.status = self.status.split('_')[0] + '_' + self.selected_tool
             return
 
-        if not any(pygame.key.get_pressed()):
+        if not self.keys.any():
             self.status = self.status.split('_')[0] + '_idle'
 
-    def collisions(self, direction):
-        for sprite in self.collision_sprites.sprites():
-            if hitbox := getattr(sprite, 'hitbox'):
-                if hitbox.colliderect(self.hitbox):
-                    if direction == 'horizontal':
-                        if self.direction.x > 0:
-                            self.hitbox.right = sprite.hitbox.left
-                        elif self.direction.x < 0:
-                            self.hitbox.left = sprite.hitbox.right
-                        self.rect.centerx = self.hitbox.centerx
-                        self.pos.x = self.hitbox.centerx
-
-                    if direction == 'vertical':
-                        if self.direction.y > 0:
-                            self.hitbox.bottom = sprite.hitbox.top
-                        elif self.direction.y < 0:
-                            self.hitbox.top = sprite.hitbox.bottom
-                        self.rect.centery = self.hitbox.centery
-                        self.pos.y = self.hitbox.centery
+    def collisions(self, direction, swept):
+        for hitbox in self.collision_sprites.hitboxes(swept):
+            if hitbox.colliderect(self.hitbox):
+                if direction == 'horizontal':
+                    if self.direction.x > 0:
+                        self.hitbox.right = hitbox.left
+                    elif self.direction.x < 0:
+                        self.hitbox.left = hitbox.right
+                    self.rect.centerx = self.hitbox.centerx
+                    self.pos.x = self.hitbox.centerx
+
+                if direction == 'vertical':
+                    if self.direction.y > 0:
+                        self.hitbox.bottom = hitbox.top
+                    elif self.direction.y < 0:
+                        self.hitbox.top = hitbox.bottom
+                    self.rect.centery = self.hitbox.centery
+                    self.pos.y = self.hitbox.centery
 
     def move(self, dt):
         if self.direction.magnitude() > 0:
             self.direction = self.direction.normalize()
 
+        start = self.hitbox.copy()
         self.pos.x += self.direction.x * self.speed * dt
         self.hitbox.centerx = round(self.pos.x)
         self.rect.centerx = self.hitbox.centerx
-        self.collisions('horizontal')
+        self.collisions('horizontal', start.union(self.hitbox))
 
+        start = self.hitbox.copy()
         self.pos.y += self.direction.y * self.speed * dt
         self.hitbox.centery = round(self.pos.y)
         self.rect.centery = self.hitbox.centery
-        self.collisions('vertical')
+        self.collisions('vertical', start.union(self.hitbox))
 
     def update(self, dt, events):
         self.get_target_position()
         self.input(events)
         self.get_status()
-        for timer in self.timers.values():
-            timer.update()
-
         self.move(dt)
-        self.animate(dt)
+        self.animate()
@@ -0,0 +1,112 @@
+from collections import deque
+from contextlib import nullcontext
+import csv
+from time import perf_counter
+
+import numpy as np
+
+from settings import PROFILE_WINDOW
+
+# handed out while profiling is off, so a stage costs a call and a with
+IDLE = nullcontext()
+
+
+class Stage:
+    def __init__(self, times, name) -> None:
+        self.times = times
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = perf_counter() - self.start
+        self.times[self.name] = self.times.get(self.name, 0) + elapsed
+
+
+class Profiler:
+    def __init__(self, window=PROFILE_WINDOW) -> None:
+        self.enabled = False
+        self.watching = False
+        self.times = {}
+        self.count = 0
+
+        # the last frames for the HUD, every frame only for a replay report
+        self.recent = deque(maxlen=window)
+        self.frames = None
+        self.file = None
+        self.writer = None
+
+    def refresh(self):
+        # timing runs only while something consumes the samples
+        self.enabled = (
+            self.watching or self.frames is not None or self.writer is not None
+        )
+
+    def watch(self, watching):
+        self.watching = watching
+        self.recent.clear()
+        self.times = {}
+        self.refresh()
+
+    def keep(self):
+        self.frames = []
+        self.refresh()
+
+    def stream(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['frame', 'stage', 'ms'])
+        self.refresh()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = self.writer = None
+            self.refresh()
+
+    def stage(self, name):
+        if not self.enabled:
+            return IDLE
+        return Stage(self.times, name)
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        times = self.times
+        self.recent.append(times)
+        if self.frames is not None:
+            self.frames.append(times)
+        if self.writer:
+            self.writer.writerows(
+                (self.count, name, f'{elapsed * 1000:.3f}')
+                for name, elapsed in times.items()
+            )
+        self.count += 1
+        self.times = {}
+
+    def averages(self):
+        totals = {}
+        for times in self.recent:
+            for name, elapsed in times.items():
+                totals[name] = totals.get(name, 0) + elapsed
+        return {name: total / len(self.recent) for name, total in totals.items()}
+
+    def percentiles(self, qs=(50, 95, 99)):
+        # stages missing from a frame cost nothing in it
+        names = list(dict.fromkeys(name for times in self.frames for name in times))
+        return {
+            name: np.percentile(
+                [times.get(name, 0) for times in self.frames], qs
+            ).tolist()
+            for name in names
+        }
+
+    def report(self, qs=(50, 95, 99)):
+        lines = [f'{"stage":<16}' + ''.join(f'{f"p{q} ms":>10}' for q in qs)]
+        for name, values in self.percentiles(qs).items():
+            lines.append(
+                f'{name:<16}' + ''.join(f'{value * 1000:>10.3f}' for value in values)
+            )
+        lines.append(f'{len(self.frames)} frames')
+        return '\n'.join(lines)
@@ -0,0 +1,86 @@
+import struct
+
+import pygame
+
+MAGIC = b'PDVR'
+HEADER = struct.Struct('<4sqH')
+STEP = struct.Struct('<BH')
+EVENT = struct.Struct('<Bi')
+
+# the keys the game polls, one bit each, the last bit is any key at all
+KEYS = [
+    pygame.K_UP,
+    pygame.K_DOWN,
+    pygame.K_LEFT,
+    pygame.K_RIGHT,
+    pygame.K_SPACE,
+    pygame.K_LCTRL,
+]
+BITS = {key: 1 << bit for bit, key in enumerate(KEYS)}
+ANY = 1 << len(KEYS)
+EVENT_TYPES = [pygame.KEYUP, pygame.KEYDOWN]
+
+
+class KeyState:
+    def __init__(self, mask=0) -> None:
+        self.mask = mask
+
+    @classmethod
+    def capture(cls):
+        pressed = pygame.key.get_pressed()
+        mask = ANY if any(pressed) else 0
+        for key, bit in BITS.items():
+            if pressed[key]:
+                mask |= bit
+        return cls(mask)
+
+    def __getitem__(self, key):
+        # keys that are not recorded read as released, like get_pressed
+        return bool(self.mask & BITS.get(key, 0))
+
+    def any(self):
+        return bool(self.mask & ANY)
+
+
+class Recorder:
+    def __init__(self, path, seed, rate) -> None:
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, seed, rate))
+
+    def step(self, keys, events):
+        events = [event for event in events if event.type in EVENT_TYPES]
+        self.file.write(STEP.pack(keys.mask, len(events)))
+        for event in events:
+            self.file.write(EVENT.pack(EVENT_TYPES.index(event.type), event.key))
+
+    def close(self):
+        self.file.close()
+
+
+class Session:
+    def __init__(self, seed, rate, steps) -> None:
+        self.seed = seed
+        self.rate = rate
+        self.steps = steps
+
+
+def read_session(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    magic, seed, rate = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a recorded session')
+
+    steps = []
+    offset = HEADER.size
+    while offset < len(data):
+        mask, count = STEP.unpack_from(data, offset)
+        offset += STEP.size
+        events = []
+        for _ in range(count):
+            kind, key = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            events.append(pygame.event.Event(EVENT_TYPES[kind], key=key))
+        steps.append((KeyState(mask), events))
+    return Session(seed, rate, steps)
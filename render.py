@@ -0,0 +1,15 @@
+class RenderQueue:
+    def __init__(self, target) -> None:
+        self.target = target
+        self.items = []
+
+    def append(self, surf, dest, area=None, special_flags=0):
+        if area is None and not special_flags:
+            self.items.append((surf, dest))
+        else:
+            self.items.append((surf, dest, area, special_flags))
+
+    def flush(self):
+        if self.items:
+            self.target.blits(self.items, doreturn=False)
+            self.items.clear()
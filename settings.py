@@ -1,8 +1,56 @@
-from pygame import Vector2
+from pygame import Rect, Vector2
 
 SCREEN_HEIGHT = 720
 SCREEN_WIDTH = 1280
 TILE_SIZE = 64
+# hitbox of a blocking map tile, the same one a Generic tile sprite had
+TILE_HITBOX = Rect(0, 0, TILE_SIZE, TILE_SIZE).inflate(
+    -TILE_SIZE * 0.2, -TILE_SIZE * 0.75
+)
+CHUNK_SIZE = 512
+CAMERA_CELL_SIZE = 256
+COLLISION_CELL_SIZE = 128
+
+# present only the changed screen regions instead of the whole frame
+DIRTY_RECTS = False
+DIRTY_RECTS_LIMIT = 32
+
+# the simulation advances in fixed steps, rendering is paced on its own
+SIMULATION_RATE = 60
+FRAME_RATE = 60
+# seconds of play before bed in a headless simulated day
+SIMULATION_DAY = 120
+# unfocused, minimized or sitting in a static shop menu
+IDLE_FRAME_RATE = 10
+# longest frame the simulation catches up on, so a stall cannot snowball
+MAX_FRAME_TIME = 0.25
+
+# threads decoding files behind the loading screen
+LOADER_THREADS = 4
+
+# print load time and size of every asset after startup
+ASSET_REPORT = False
+
+# frames averaged by the profiling HUD, which redraws its text every few frames
+PROFILE_WINDOW = 60
+PROFILE_REFRESH = 10
+
+# largest texture page written by the atlas and map cache builders
+ATLAS_SIZE = 2048
+
+# drops spawned per second over the whole map, per rain layer
+RAIN_RATE = 600
+RAIN_CAPACITY = 512
+
+# file, volume, channels and minimum seconds between plays per sound effect
+SOUND_EFFECTS = {
+    'axe': ('axe.mp3', 1.0, 2, 0.05),
+    'hoe': ('hoe.wav', 0.1, 2, 0.05),
+    'plant': ('plant.wav', 0.2, 2, 0.05),
+    'success': ('success.wav', 0.2, 3, 0),
+    'water': ('water.mp3', 0.2, 2, 0.1),
+}
+MUSIC_VOLUME = 0.2
 
 OVERLAY_POSITIONS = {
     'tool': (40, SCREEN_HEIGHT - 15),
@@ -1,75 +1,113 @@
 from pathlib import Path
-from random import choice, randint
 
-import pygame
+import numpy as np
 
-from settings import LAYERS, SCREEN_HEIGHT, SCREEN_WIDTH
-from sprites import Generic
+from settings import LAYERS, RAIN_CAPACITY, RAIN_RATE
 from support import import_folder
 
 
 class Sky:
-    def __init__(self) -> None:
-        self.display_surf = pygame.display.get_surface()
-        self.full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.start_color = [255, 255, 255]
-        self.end_color = [38, 101, 189 ]
-    
-    def display(self, dt):
-        for index, color in enumerate(self.end_color):
-            if self.start_color[index] > color:
-                self.start_color[index] -= 2 * dt
-        self.full_surf.fill(self.start_color)
-        self.display_surf.blit(self.full_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-
-
-class Drop(Generic):
-    def __init__(self, pos, surf, groups, z, moving) -> None:
-        super().__init__(pos, surf, groups, z)
-
-        self.lifetime = randint(400, 500)
-        self.start_time = pygame.time.get_ticks()
+    def __init__(self, tint) -> None:
+        self.tint = tint
+        self.start_color = (255, 255, 255)
+        self.end_color = (38, 101, 189)
+        self.speed = 2
 
+        # day-night curve, one entry per colour step
+        steps = max(start - end for start, end in zip(self.start_color, self.end_color))
+        self.colors = [
+            tuple(max(start - step, end) for start, end in zip(self.start_color, self.end_color))
+            for step in range(steps + 1)
+        ]
+        self.reset()
+
+    def reset(self):
+        self.elapsed = 0
+        self.color = self.colors[0]
+        self.changed = True
+
+    def update(self, dt):
+        self.elapsed += dt
+        step = min(int(self.elapsed * self.speed), len(self.colors) - 1)
+        self.changed = self.colors[step] is not self.color
+        self.color = self.colors[step]
+
+    def display(self):
+        self.tint.multiply(self.color)
+
+
+class DropPool:
+    def __init__(self, frames, capacity, rate, moving, seed) -> None:
+        self.frames = frames
+        self.rate = rate
         self.moving = moving
+        self.rng = np.random.default_rng(seed)
+        self.spawn_due = 0
+
+        # one slot per drop, dead slots get reused
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.lifetime = np.zeros(capacity)
+        self.frame = np.zeros(capacity, int)
+        self.alive = np.zeros(capacity, bool)
+
+        self.reach_x = max(frame.get_width() for frame in frames)
+        self.reach_y = max(frame.get_height() for frame in frames)
+
+    def spawn(self, count, width, height):
+        slots = np.flatnonzero(~self.alive)[:count]
+        size = len(slots)
+        self.pos[slots] = self.rng.integers(0, (width + 1, height + 1), (size, 2))
+        self.lifetime[slots] = self.rng.integers(400, 501, size) / 1000
+        self.frame[slots] = self.rng.integers(0, len(self.frames), size)
         if self.moving:
-            self.pos = pygame.math.Vector2(self.rect.topleft)
-            self.direction = pygame.math.Vector2(-2, 4)
-            self.speed = randint(200, 250)
+            self.velocity[slots] = np.outer(self.rng.integers(200, 251, size), (-2, 4))
+        self.alive[slots] = True
 
-    def update(self, dt, events):
+    def update(self, dt, spawning, width, height):
+        self.lifetime -= dt
+        self.alive &= self.lifetime > 0
         if self.moving:
-            self.pos += self.direction * self.speed * dt
-            self.rect.topleft = (round(self.pos.x), round(self.pos.y))
+            self.pos += self.velocity * dt
+
+        if spawning:
+            self.spawn_due += self.rate * dt
+            count = int(self.spawn_due)
+            self.spawn_due -= count
+            if count:
+                self.spawn(count, width, height)
 
-        if pygame.time.get_ticks() - self.start_time >= self.lifetime:
-            self.kill()
+    def draw(self, view, offset, append):
+        pos = np.rint(self.pos)
+        visible = np.flatnonzero(
+            self.alive
+            & (pos[:, 0] < view.right) & (pos[:, 0] + self.reach_x > view.left)
+            & (pos[:, 1] < view.bottom) & (pos[:, 1] + self.reach_y > view.top)
+        )
+        frames = self.frames
+        offset_x, offset_y = offset
+        for (x, y), frame in zip(pos[visible].astype(int).tolist(), self.frame[visible].tolist()):
+            append((frames[frame], (x - offset_x, y - offset_y)))
 
 
 class Rain:
-    def __init__(self, all_sprites, ground_surf) -> None:
-        self.all_sprites = all_sprites
-        self.rain_drops = import_folder(Path('assets', 'graphics', 'rain', 'drops'))
-        self.rain_floor = import_folder(Path('assets', 'graphics', 'rain', 'floor'))
+    def __init__(self, all_sprites, ground_surf, rng) -> None:
         self.floor_w, self.floor_h = ground_surf.get_size()
-
-    def create_floor(self):
-        Drop(
-            (randint(0, self.floor_w), randint(0, self.floor_h)),
-            choice(self.rain_floor),
-            self.all_sprites,
-            LAYERS['rain floor'],
-            False,
+        self.floor = DropPool(
+            import_folder(Path('assets', 'graphics', 'rain', 'floor')), RAIN_CAPACITY, RAIN_RATE, False, rng.getrandbits(64)
         )
-
-    def create_drops(self):
-        Drop(
-            (randint(0, self.floor_w), randint(0, self.floor_h)),
-            choice(self.rain_drops),
-            self.all_sprites,
-            LAYERS['rain drops'],
-            True,
+        self.drops = DropPool(
+            import_folder(Path('assets', 'graphics', 'rain', 'drops')), RAIN_CAPACITY, RAIN_RATE, True, rng.getrandbits(64)
         )
 
-    def update(self):
-        self.create_floor()
-        self.create_drops()
+        # drops are drawn by the camera at their depth, outside of the sprite sort
+        all_sprites.add_layer(LAYERS['rain floor'], self.floor.draw)
+        all_sprites.add_layer(LAYERS['rain drops'], self.drops.draw)
+
+    @property
+    def active(self):
+        return self.floor.alive.any() or self.drops.alive.any()
+
+    def update(self, dt, raining):
+        self.floor.update(dt, raining, self.floor_w, self.floor_h)
+        self.drops.update(dt, raining, self.floor_w, self.floor_h)
@@ -1,10 +1,16 @@
 from pathlib import Path
-from random import choice
 
+import numpy as np
 import pygame
 
 from settings import GROW_SPEED, LAYERS, PLANT_Y_OFFSET, SOIL_MAP, TILE_SIZE
-from support import import_collections, import_folder, import_folder_dict
+from support import assets, import_collections, import_folder, import_folder_dict
+
+# soil grid cell flags
+FARMABLE = 1
+TILLED = 2
+WATERED = 4
+PLANTED = 8
 
 
 class SoilTile(pygame.sprite.Sprite):
@@ -15,163 +21,259 @@ class SoilTile(pygame.sprite.Sprite):
         self.z = z
 
 
+class PlantStore:
+    def __init__(self, shape, plant_surfs) -> None:
+        self.types = list(plant_surfs)
+        self.frames = [plant_surfs[plant_type] for plant_type in self.types]
+        self.max_ages = np.array([len(frames) - 1 for frames in self.frames], float)
+        self.grow_speeds = np.array([GROW_SPEED[t] for t in self.types], float)
+
+        # one row per plant, tiles point back at their row
+        self.at = np.full(shape, -1, np.int32)
+        self.size = 0
+        self.xs = np.zeros(64, np.int32)
+        self.ys = np.zeros(64, np.int32)
+        self.kinds = np.zeros(64, np.uint8)
+        self.ages = np.zeros(64, float)
+        self.speeds = np.zeros(64, float)
+        self.harvestable = np.zeros(64, bool)
+
+    def columns(self):
+        return 'xs', 'ys', 'kinds', 'ages', 'speeds', 'harvestable'
+
+    def add(self, x, y, plant_type):
+        if self.size == len(self.xs):
+            for name in self.columns():
+                column = getattr(self, name)
+                setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+
+        index = self.size
+        kind = self.types.index(plant_type)
+        self.xs[index], self.ys[index] = x, y
+        self.kinds[index] = kind
+        self.ages[index] = 0
+        self.speeds[index] = self.grow_speeds[kind]
+        self.harvestable[index] = False
+        self.at[y, x] = index
+        self.size += 1
+
+    def remove(self, x, y):
+        index = self.at[y, x]
+        last = self.size - 1
+        # the last row fills the gap to keep the columns dense
+        if index != last:
+            for name in self.columns():
+                column = getattr(self, name)
+                column[index] = column[last]
+            self.at[self.ys[index], self.xs[index]] = index
+        self.at[y, x] = -1
+        self.size = last
+
+    def grow(self, watered):
+        size = self.size
+        ages = self.ages[:size]
+        kinds = self.kinds[:size]
+        mask = watered[self.ys[:size], self.xs[:size]]
+        ages += np.where(mask, self.speeds[:size], 0)
+        max_ages = self.max_ages[kinds]
+        np.minimum(ages, max_ages, out=ages)
+        self.harvestable[:size] = ages >= max_ages
+
+    def look(self, x, y):
+        index = self.at[y, x]
+        kind = self.kinds[index]
+        plant_type = self.types[kind]
+        age = int(self.ages[index])
+        image = self.frames[kind][age]
+        rect = image.get_rect(
+            midbottom=(
+                x * TILE_SIZE + TILE_SIZE // 2,
+                (y + 1) * TILE_SIZE + PLANT_Y_OFFSET[plant_type],
+            )
+        )
+        z = LAYERS['main'] if age > 0 else LAYERS['ground plant']
+        return plant_type, image, rect, z
+
+    def tiles(self, rect):
+        left, top = max(rect.left // TILE_SIZE, 0), max(rect.top // TILE_SIZE, 0)
+        ys, xs = np.nonzero(
+            self.at[
+                top : (rect.bottom - 1) // TILE_SIZE + 1,
+                left : (rect.right - 1) // TILE_SIZE + 1,
+            ]
+            >= 0
+        )
+        return [(int(x) + left, int(y) + top) for x, y in zip(xs, ys)]
+
+
 class Plant(pygame.sprite.Sprite):
-    def __init__(self, groups, plant_type, soil, frames, check_watered):
+    def __init__(self, groups, store, tile):
         super().__init__(groups)
-        self.plant_type = plant_type
-        self.frames = frames
-        self.soil = soil
-        self.check_watered = check_watered
-
-        self.age = 0
-        self.max_age = len(self.frames) - 1
-        self.grow_speed = GROW_SPEED[plant_type]
-        self.harvestable = False
-
-        self.image = self.frames[int(self.age)]
-        self.rect = self.image.get_rect(
-            midbottom=soil.rect.midbottom
-            + pygame.math.Vector2(0, PLANT_Y_OFFSET[plant_type])
-        )
-        self.z = LAYERS['ground plant']
-
-    def grow(self):
-        if self.check_watered(self.rect.center):
-            self.age += self.grow_speed
-            if int(self.age) > 0:
-                self.z = LAYERS['main']
-                if self.age >= self.max_age:
-                    self.age = self.max_age
-                    self.harvestable = True
-
-            self.image = self.frames[int(self.age)]
-            self.rect = self.image.get_rect(
-                midbottom=self.soil.rect.midbottom
-                + pygame.math.Vector2(0, PLANT_Y_OFFSET[self.plant_type])
-            )
+        self.store = store
+        self.tile = tile
+        self.sync()
+
+    def sync(self):
+        self.plant_type, self.image, self.rect, self.z = self.store.look(*self.tile)
 
 
 class SoilLayer:
-    def __init__(self, all_sprites, tmx_data) -> None:
+    def __init__(self, all_sprites, tile_index, tmx_data, sounds, rng) -> None:
         self.all_sprites = all_sprites
+        self.tile_index = tile_index
+        self.sounds = sounds
+        self.rng = rng
         self.soil_sprites = pygame.sprite.Group()
         self.water_sprites = pygame.sprite.Group()
-        self.plant_sprites = pygame.sprite.Group()
+        self.plant_sprites = {}
 
-        self.soil_surf = pygame.image.load(Path('assets', 'graphics', 'soil', 'o.png'))
         self.soil_surfs = import_folder_dict(Path('assets', 'graphics', 'soil'))
         self.water_surfs = import_folder(Path('assets', 'graphics', 'soil_water'))
         self.plant_surfs = import_collections(Path('assets', 'graphics', 'fruit'))
 
-        self.create_soil_grid(tmx_data)
-        self.create_hit_rects()
+        # autotile surface for every 4-bit neighbour mask, bits in SOIL_MAP order
+        self.tile_surfs = [
+            self.soil_surfs[
+                ''.join(
+                    letter
+                    for bit, letter in enumerate(SOIL_MAP.values())
+                    if mask & 1 << bit
+                )
+                or 'o'
+            ]
+            for mask in range(1 << len(SOIL_MAP))
+        ]
+        self.soil_tiles = {}
 
-        # sounds
-        self.hoe_sound = pygame.mixer.Sound(Path('assets', 'audio', 'hoe.wav'))
-        self.hoe_sound.set_volume(0.1)
-        self.watering = pygame.mixer.Sound(Path('assets', 'audio', 'water.mp3'))
-        self.watering.set_volume(0.2)
-        self.plant_sound = pygame.mixer.Sound(Path('assets', 'audio', 'plant.wav'))
-        self.plant_sound.set_volume(0.2)
+        self.create_soil_grid(tmx_data)
+        self.plants = PlantStore(self.grid.shape, self.plant_surfs)
 
     def create_soil_grid(self, tmx_data):
-        ground = pygame.image.load(Path('assets', 'graphics', 'world', 'ground.png'))
+        ground = assets.image(Path('assets', 'graphics', 'world', 'ground.png'))
         h_tiles, v_tiles = (
             ground.get_width() // TILE_SIZE,
             ground.get_height() // TILE_SIZE,
         )
 
-        self.grid = [[set() for _ in range(h_tiles)] for _ in range(v_tiles)]
-        for x, y, _ in tmx_data.get_layer_by_name('Farmable').tiles():
-            self.grid[y][x].add('F')
+        self.grid = np.zeros((v_tiles, h_tiles), np.uint8)
+        farmable = tmx_data.get_layer_by_name('Farmable').mask()
+        self.grid[: farmable.shape[0], : farmable.shape[1]][farmable] |= FARMABLE
+
+    def in_grid(self, x, y):
+        return 0 <= y < self.grid.shape[0] and 0 <= x < self.grid.shape[1]
+
+    def has(self, x, y, flag):
+        return self.in_grid(x, y) and bool(self.grid[y, x] & flag)
 
-    def create_hit_rects(self):
-        self.hit_rects = []
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'F' in cell:
-                    x, y = index_row * TILE_SIZE, index_col * TILE_SIZE
-                    rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                    self.hit_rects.append(rect)
+    def count(self, flag):
+        return int(np.count_nonzero(self.grid & flag))
+
+    def cells(self, flag):
+        return [(int(x), int(y)) for y, x in np.argwhere(self.grid & flag)]
 
     def get_hit(self, point):
-        for rect in self.hit_rects:
-            if rect.collidepoint(point):
-                x, y = rect.x // TILE_SIZE, rect.y // TILE_SIZE
-                if 'F' in self.grid[y][x]:
-                    self.hoe_sound.play()
-                    self.grid[y][x].add('X')
-                    self.create_soil_tiles()
-                    if self.raining:
-                        self.water_all()
-
-    def create_soil_tiles(self):
-        self.soil_sprites.empty()
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell:
-                    tile_type = ''
-                    for (x, y), letter in SOIL_MAP.items():
-                        if 'X' in self.grid[index_row - y][index_col - x]:
-                            tile_type += letter
-                    SoilTile(
-                        (index_col * TILE_SIZE, index_row * TILE_SIZE),
-                        self.soil_surfs[tile_type or 'o'],
-                        [self.all_sprites, self.soil_sprites],
-                        LAYERS['soil'],
-                    )
+        x, y = int(point[0]) // TILE_SIZE, int(point[1]) // TILE_SIZE
+        if self.has(x, y, FARMABLE):
+            self.sounds.play('hoe')
+            self.grid[y, x] |= TILLED
+            self.create_soil_tiles(x, y)
+            if self.raining:
+                self.water_all()
+
+    def create_soil_tiles(self, x, y):
+        # only the hit cell and its neighbours can change their tile
+        for col, row in [(x, y)] + [(x + dx, y + dy) for dx, dy in SOIL_MAP]:
+            if not self.has(col, row, TILLED):
+                continue
+
+            mask = 0
+            for bit, (dx, dy) in enumerate(SOIL_MAP):
+                if self.has(col - dx, row - dy, TILLED):
+                    mask |= 1 << bit
+
+            surf = self.tile_surfs[mask]
+            old = self.soil_tiles.get((col, row))
+            if old:
+                if old.image is surf:
+                    continue
+                self.tile_index.remove('soil', old)
+                old.kill()
+
+            soil_sprite = SoilTile(
+                (col * TILE_SIZE, row * TILE_SIZE),
+                surf,
+                [self.all_sprites, self.soil_sprites],
+                LAYERS['soil'],
+            )
+            self.soil_tiles[col, row] = soil_sprite
+            self.tile_index.add('soil', soil_sprite)
 
     def water(self, point):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(point):
-                self.watering.play()
-                x, y = soil_sprite.rect.x // TILE_SIZE, soil_sprite.rect.y // TILE_SIZE
-                self.grid[y][x].add('W')
-                SoilTile(
-                    soil_sprite.rect.topleft,
-                    choice(self.water_surfs),
-                    [self.all_sprites, self.water_sprites],
-                    LAYERS['soil water'],
-                )
+        for soil_sprite in self.tile_index.at('soil', point):
+            self.sounds.play('water')
+            x, y = soil_sprite.rect.x // TILE_SIZE, soil_sprite.rect.y // TILE_SIZE
+            self.grid[y, x] |= WATERED
+            SoilTile(
+                soil_sprite.rect.topleft,
+                self.rng.choice(self.water_surfs),
+                [self.all_sprites, self.water_sprites],
+                LAYERS['soil water'],
+            )
 
     def water_all(self):
-        for soil_sprite in self.soil_sprites.sprites():
-            x, y = soil_sprite.rect.x // TILE_SIZE, soil_sprite.rect.y // TILE_SIZE
-            if not 'W' in self.grid[y][x]:
-                self.grid[y][x].add('W')
-                SoilTile(
-                    soil_sprite.rect.topleft,
-                    choice(self.water_surfs),
-                    [self.all_sprites, self.water_sprites],
-                    LAYERS['soil water'],
-                )
+        dry = (self.grid & (TILLED | WATERED)) == TILLED
+        self.grid[dry] |= WATERED
+        for y, x in np.argwhere(dry):
+            SoilTile(
+                (x * TILE_SIZE, y * TILE_SIZE),
+                self.rng.choice(self.water_surfs),
+                [self.all_sprites, self.water_sprites],
+                LAYERS['soil water'],
+            )
 
     def remove_water(self):
         for sprite in self.water_sprites.sprites():
             sprite.kill()
 
-        for row in self.grid:
-            for cell in row:
-                cell.discard('W')
+        self.grid &= ~np.uint8(WATERED)
 
     def check_watered(self, pos):
-        return 'W' in self.grid[pos[1] // TILE_SIZE][pos[0] // TILE_SIZE]
+        return self.has(pos[0] // TILE_SIZE, pos[1] // TILE_SIZE, WATERED)
 
     def update_plants(self):
-        for plant in self.plant_sprites.sprites():
-            plant.grow()
+        self.plants.grow((self.grid & WATERED).astype(bool))
+        for plant in self.plant_sprites.values():
+            plant.sync()
+            self.all_sprites.refresh(plant)
+
+    def show(self, view):
+        # plants only get a sprite while they are near the camera, the margin
+        # covers the camera catching up with the player this frame
+        tiles = set(self.plants.tiles(view.inflate(TILE_SIZE * 4, TILE_SIZE * 4)))
+        for tile in self.plant_sprites.keys() - tiles:
+            self.plant_sprites.pop(tile).kill()
+        for tile in tiles - self.plant_sprites.keys():
+            self.plant_sprites[tile] = Plant([self.all_sprites], self.plants, tile)
+
+    def harvest(self, rect):
+        harvested = []
+        # plant images reach at most one tile past their own
+        for x, y in self.plants.tiles(rect.inflate(TILE_SIZE * 2, TILE_SIZE * 2)):
+            if not self.plants.harvestable[self.plants.at[y, x]]:
+                continue
+            plant_type, image, plant_rect, _ = self.plants.look(x, y)
+            if plant_rect.colliderect(rect):
+                harvested.append((plant_type, image, plant_rect))
+                self.plants.remove(x, y)
+                self.grid[y, x] &= ~np.uint8(PLANTED)
+                if (x, y) in self.plant_sprites:
+                    self.plant_sprites.pop((x, y)).kill()
+        return harvested
 
     def plant_seed(self, target_pos, seed):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(target_pos):
-                x, y = soil_sprite.rect.x // TILE_SIZE, soil_sprite.rect.y // TILE_SIZE
-                if 'P' not in self.grid[y][x]:
-                    self.plant_sound.play()
-                    self.grid[y][x].add('P')
-                    Plant(
-                        [self.all_sprites, self.plant_sprites],
-                        seed,
-                        soil_sprite,
-                        self.plant_surfs[seed],
-                        self.check_watered,
-                    )
+        for soil_sprite in self.tile_index.at('soil', target_pos):
+            x, y = soil_sprite.rect.x // TILE_SIZE, soil_sprite.rect.y // TILE_SIZE
+            if not self.grid[y, x] & PLANTED:
+                self.sounds.play('plant')
+                self.grid[y, x] |= PLANTED
+                self.plants.add(x, y, seed)
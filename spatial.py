@@ -0,0 +1,177 @@
+from bisect import bisect_left
+from collections import defaultdict
+from heapq import merge
+
+
+class SpatialGrid:
+    def __init__(self, cell_size) -> None:
+        self.cell_size = cell_size
+        # dict cells keep lookups in insertion order
+        self.cells = defaultdict(dict)
+        self.bounds = {}
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size,
+            (rect.bottom - 1) // size,
+        )
+
+    def insert(self, item, rect):
+        bounds = self.cell_range(rect)
+        self.bounds[item] = bounds
+        left, top, right, bottom = bounds
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                self.cells[x, y][item] = None
+
+    def remove(self, item):
+        left, top, right, bottom = self.bounds.pop(item)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                cell = self.cells[x, y]
+                del cell[item]
+                if not cell:
+                    del self.cells[x, y]
+
+    def move(self, item, rect):
+        if self.bounds.get(item) == self.cell_range(rect):
+            return False
+        if item in self.bounds:
+            self.remove(item)
+        self.insert(item, rect)
+        return True
+
+    def query(self, rect):
+        left, top, right, bottom = self.cell_range(rect)
+        found = {}
+        cells = self.cells
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                if (x, y) in cells:
+                    found.update(cells[x, y])
+        return found
+
+    def at(self, point):
+        return self.cells.get(
+            (int(point[0]) // self.cell_size, int(point[1]) // self.cell_size), {}
+        )
+
+    def __contains__(self, item):
+        return item in self.bounds
+
+    def __len__(self):
+        return len(self.bounds)
+
+
+class TileIndex:
+    def __init__(self, tile_size) -> None:
+        self.layers = defaultdict(lambda: SpatialGrid(tile_size))
+
+    def add(self, kind, item):
+        self.layers[kind].insert(item, item.rect)
+
+    def remove(self, kind, item):
+        self.layers[kind].remove(item)
+
+    def at(self, kind, point):
+        return [
+            item
+            for item in self.layers[kind].at(point)
+            if item.rect.collidepoint(point)
+        ]
+
+    def overlapping(self, kind, rect):
+        return [
+            item
+            for item in self.layers[kind].query(rect)
+            if item.rect.colliderect(rect)
+        ]
+
+
+class DepthBucket:
+    def __init__(self) -> None:
+        self.keys = []
+        self.items = []
+        self.reach = 0
+
+    def insert(self, item, key, height):
+        index = bisect_left(self.keys, key)
+        self.keys.insert(index, key)
+        self.items.insert(index, item)
+        self.reach = max(self.reach, height // 2 + 1)
+
+    def remove(self, key):
+        index = bisect_left(self.keys, key)
+        del self.keys[index]
+        del self.items[index]
+
+    def window(self, top, bottom):
+        return (
+            bisect_left(self.keys, (top - self.reach,)),
+            bisect_left(self.keys, (bottom + self.reach + 1,)),
+        )
+
+    def __len__(self):
+        return len(self.items)
+
+
+class DepthColumns:
+    def __init__(self, column_width) -> None:
+        self.column_width = column_width
+        self.columns = {}
+        self.reach = 0
+
+    def column(self, rect):
+        return rect.centerx // self.column_width
+
+    def insert(self, item, column, key, rect):
+        if column not in self.columns:
+            self.columns[column] = DepthBucket()
+        self.columns[column].insert(item, key, rect.height)
+        self.reach = max(self.reach, rect.width // 2 + 1)
+
+    def remove(self, column, key):
+        self.columns[column].remove(key)
+
+    def query(self, view):
+        width = self.column_width
+        runs = []
+        for column in range(
+            (view.left - self.reach) // width, (view.right + self.reach) // width + 1
+        ):
+            bucket = self.columns.get(column)
+            if bucket:
+                start, stop = bucket.window(view.top, view.bottom)
+                if start < stop:
+                    runs.append((bucket.keys[start:stop], bucket.items[start:stop]))
+
+        if len(runs) == 1:
+            return runs[0][1]
+        # keys are unique, so the merge never has to compare the items
+        return (item for _, item in merge(*(zip(keys, items) for keys, items in runs)))
+
+
+class TileMask:
+    def __init__(self, width, height, tile_size, hitbox) -> None:
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.hitbox = hitbox
+        self.bits = bytearray(width * height)
+
+    def add(self, x, y):
+        self.bits[y * self.width + x] = 1
+
+    def hitboxes(self, rect):
+        size = self.tile_size
+        left, top = max(rect.left // size, 0), max(rect.top // size, 0)
+        right = min((rect.right - 1) // size, self.width - 1)
+        bottom = min((rect.bottom - 1) // size, self.height - 1)
+        for y in range(top, bottom + 1):
+            row = y * self.width
+            for x in range(left, right + 1):
+                if self.bits[row + x]:
+                    yield self.hitbox.move(x * size, y * size)
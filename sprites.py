@@ -1,10 +1,10 @@
+from functools import lru_cache
 from pathlib import Path
-from random import choice, randint
 
 import pygame
 
 from settings import APPLE_POS, LAYERS
-from timer import Timer
+from support import assets
 
 
 class Generic(pygame.sprite.Sprite):
@@ -25,19 +25,15 @@ class Interaction(Generic):
         self.name = name
 
 
-class Water(Generic):
-    def __init__(self, pos, frames, groups) -> None:
+class Animated(Generic):
+    def __init__(self, pos, frames, animation, groups, z) -> None:
         self.frames = frames
-        self.frame_index = 0
+        self.animation = animation
 
-        super().__init__(pos, self.frames[self.frame_index], groups, LAYERS['water'])
+        super().__init__(pos, self.frames[self.animation.frame], groups, z)
 
     def update(self, dt, events):
-        self.frame_index += 5 * dt
-        if self.frame_index >= len(self.frames):
-            self.frame_index = 0
-
-        self.image = self.frames[int(self.frame_index)]
+        self.image = self.frames[self.animation.frame]
 
 
 class WildFlower(Generic):
@@ -46,71 +42,86 @@ class WildFlower(Generic):
         self.hitbox = self.rect.copy().inflate(-20, -self.rect.height * 0.9)
 
 
-class Particle(Generic):
-    def __init__(self, pos, surf, groups, z, duration=200) -> None:
-        super().__init__(pos, surf, groups, z)
-        self.start_time = pygame.time.get_ticks()
-        self.duration = duration
+@lru_cache(maxsize=64)
+def silhouette(surf):
+    mask_surf = pygame.mask.from_surface(surf).to_surface()
+    mask_surf.set_colorkey((0, 0, 0))
+    return mask_surf
 
-        mask_surf = pygame.mask.from_surface(self.image)
-        new_surf = mask_surf.to_surface()
-        new_surf.set_colorkey((0, 0, 0))
-        self.image = new_surf
 
-    def update(self, dt, events):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.start_time > self.duration:
-            self.kill()
+class Particle(pygame.sprite.Sprite):
+    def start(self, pos, surf, z):
+        self.image = silhouette(surf)
+        self.rect = self.image.get_rect(topleft=pos)
+        self.z = z
+
+
+class ParticlePool:
+    def __init__(self, group, scheduler) -> None:
+        # lifetimes are scheduler events, in milliseconds of level time
+        self.group = group
+        self.scheduler = scheduler
+        self.free = []
+        self.live = set()
+
+    def spawn(self, pos, surf, z, duration=200):
+        particle = self.free.pop() if self.free else Particle()
+        particle.start(pos, surf, z)
+        self.group.add(particle)
+        self.live.add(particle)
+        self.scheduler.schedule(duration, lambda: self.expire(particle))
+
+    def expire(self, particle):
+        particle.kill()
+        self.live.remove(particle)
+        self.free.append(particle)
 
 
 class Tree(Generic):
-    def __init__(self, pos, surf, groups, name, player_add) -> None:
+    def __init__(
+        self, pos, surf, groups, name, player_add, particles, sounds, rng
+    ) -> None:
         super().__init__(pos, surf, groups)
+        self.all_sprites = groups[0]
+        self.collision_sprites = groups[1]
+        self.rng = rng
 
         self.health = 5
         self.alive = 5
-        self.stum_surf = pygame.image.load(
+        self.stum_surf = assets.image(
             Path('assets', 'graphics', 'stumps', f'{name.lower()}.png')
-        ).convert_alpha()
-        self.invul_timer = Timer(200)
+        )
 
-        self.apple_surf = pygame.image.load(
-            Path('assets', 'graphics', 'fruit', 'apple.png')
-        ).convert_alpha()
+        self.apple_surf = assets.image(Path('assets', 'graphics', 'fruit', 'apple.png'))
         self.apple_pos = APPLE_POS[name]
         self.apple_sprites = pygame.sprite.Group()
         self.create_fruit()
 
         self.player_add = player_add
-
-        # sounds
-        self.axe_sound = pygame.mixer.Sound(Path('assets', 'audio', 'axe.mp3'))
+        self.particles = particles
+        self.sounds = sounds
 
     def damage(self):
 
         # play sound
-        self.axe_sound.play()
+        self.sounds.play('axe')
 
         self.health -= 1
         if len(sprites := self.apple_sprites.sprites()) > 0:
-            random_apple = choice(sprites)
-            Particle(
-                random_apple.rect.topleft,
-                random_apple.image,
-                self.groups()[0],
-                LAYERS['fruit'],
+            random_apple = self.rng.choice(sprites)
+            self.particles.spawn(
+                random_apple.rect.topleft, random_apple.image, LAYERS['fruit']
             )
             random_apple.kill()
             self.player_add('apple')
 
     def check_death(self):
         if self.health <= 0:
-            Particle(
-                self.rect.topleft, self.image, self.groups()[0], LAYERS['fruit'], 300
-            )
+            self.particles.spawn(self.rect.topleft, self.image, LAYERS['fruit'], 300)
             self.image = self.stum_surf
             self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
             self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+            self.collision_sprites.refresh(self)
             self.alive = False
             self.player_add('wood')
 
@@ -120,10 +131,10 @@ class Tree(Generic):
 
     def create_fruit(self):
         for x, y in self.apple_pos:
-            if randint(0, 10) < 2:
+            if self.rng.randint(0, 10) < 2:
                 Generic(
                     (self.rect.left + x, self.rect.top + y),
                     self.apple_surf,
-                    [self.apple_sprites, self.groups()[0]],
+                    [self.apple_sprites, self.all_sprites],
                     LAYERS['fruit'],
                 )
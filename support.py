@@ -1,14 +1,200 @@
+import json
 from pathlib import Path
+from time import perf_counter
 
 import pygame
 
+# written by build_atlas.py, frame folders fall back to single files without it
+ATLAS_INDEX = Path('assets', 'atlas', 'index.json')
+
+# files read while the loading screen is up, map tilesets come from the map cache
+STARTUP_GRAPHICS = [
+    'character',
+    'fruit',
+    'overlay',
+    'rain',
+    'soil',
+    'soil_water',
+    'stumps',
+    'water',
+    'world',
+]
+STARTUP_SOUNDS = ['axe.mp3', 'hoe.wav', 'plant.wav', 'success.wav', 'water.mp3']
+SOUND_SUFFIXES = {'.mp3', '.ogg', '.wav'}
+
+
+def folder_stamp(folder):
+    # recorded per atlas folder, any added, removed or edited frame changes it
+    folder = Path(folder)
+    if not folder.is_dir():
+        return None
+    return {file.name: file.stat().st_mtime_ns for file in sorted(folder.iterdir())}
+
+
+def decode(path):
+    # runs on a loader thread, conversion for the display stays on the main thread
+    start = perf_counter()
+    if path.suffix == '.png':
+        loaded = pygame.image.load(path)
+    elif path.suffix in SOUND_SUFFIXES:
+        loaded = pygame.mixer.Sound(path)
+    else:
+        loaded = path.read_bytes()
+    return loaded, perf_counter() - start
+
+
+class Assets:
+    def __init__(self) -> None:
+        # every path is loaded once and shared by all callers
+        self.surfaces = {}
+        self.sounds = {}
+        self.stats = {}
+        self.atlas = None
+        self.pending = {}
+
+    def prefetch(self, paths, pool):
+        for path in map(Path, paths):
+            if path not in self.surfaces and path not in self.sounds:
+                if path not in self.pending:
+                    self.pending[path] = pool.submit(decode, path)
+
+    def ready(self, path):
+        path = Path(path)
+        return path not in self.pending or self.pending[path].done()
+
+    def progress(self, paths):
+        return sum(map(self.ready, paths)) / max(len(paths), 1)
+
+    def discard(self, path):
+        path = Path(path)
+        self.pending.pop(path, None)
+        self.surfaces.pop(path, None)
+
+    def decoded(self, path, load):
+        if path in self.pending:
+            return self.pending.pop(path).result()
+        start = perf_counter()
+        return load(path), perf_counter() - start
+
+    def image(self, path):
+        path = Path(path)
+        if path not in self.surfaces:
+            surf, seconds = self.decoded(path, pygame.image.load)
+            start = perf_counter()
+            surf = surf.convert_alpha()
+            self.surfaces[path] = surf
+            self.stats[path] = (
+                seconds + perf_counter() - start,
+                surf.get_pitch() * surf.get_height(),
+            )
+        return self.surfaces[path]
+
+    def read(self, path):
+        path = Path(path)
+        data, seconds = self.decoded(path, Path.read_bytes)
+        self.stats[path] = (seconds, len(data))
+        return data
+
+    def load_atlas(self):
+        if self.atlas is None:
+            self.atlas = (
+                json.loads(ATLAS_INDEX.read_text()) if ATLAS_INDEX.exists() else {}
+            )
+            # folders changed since the atlas was built load their files again
+            sources = self.atlas.get('sources', {})
+            folders = self.atlas.get('folders', {})
+            for folder in list(folders):
+                if sources.get(folder) != folder_stamp(folder):
+                    del folders[folder]
+        return self.atlas
+
+    def startup_files(self):
+        atlas = self.load_atlas()
+        covered = set(atlas.get('folders', {}))
+        files = [ATLAS_INDEX.parent / page for page in atlas.get('pages', [])]
+        for folder in STARTUP_GRAPHICS:
+            files += [
+                path
+                for path in sorted(Path('assets', 'graphics', folder).rglob('*.png'))
+                if path.parent.as_posix() not in covered
+            ]
+        files += [Path('assets', 'audio', sound) for sound in STARTUP_SOUNDS]
+        return files
+
+    def folder(self, path):
+        frames = self.load_atlas().get('folders', {}).get(Path(path).as_posix())
+        if frames is None:
+            return [(f.stem, self.image(f)) for f in sorted(Path(path).iterdir())]
+
+        pages = [ATLAS_INDEX.parent / page for page in self.atlas['pages']]
+        return [
+            (stem, self.image(pages[page]).subsurface(x, y, width, height))
+            for stem, page, x, y, width, height in frames
+        ]
+
+    def sound(self, path):
+        path = Path(path)
+        if path not in self.sounds:
+            sound, seconds = self.decoded(path, pygame.mixer.Sound)
+            self.sounds[path] = sound
+            frequency, size, channels = pygame.mixer.get_init()
+            samples = round(sound.get_length() * frequency)
+            self.stats[path] = (seconds, samples * abs(size) // 8 * channels)
+        return self.sounds[path]
+
+    def report(self):
+        lines = [
+            f'{seconds * 1000:8.2f} ms {size / 1024:10.1f} KiB  {path}'
+            for path, (seconds, size) in sorted(
+                self.stats.items(), key=lambda item: -item[1][1]
+            )
+        ]
+        seconds = sum(seconds for seconds, _ in self.stats.values())
+        size = sum(size for _, size in self.stats.values())
+        lines.append(
+            f'{seconds * 1000:8.2f} ms {size / 1024:10.1f} KiB  total, {len(self.stats)} assets'
+        )
+        return '\n'.join(lines)
+
+
+assets = Assets()
+
+
+def pack_pages(frames, size):
+    # shelf packing, tallest frames first
+    pages = [[]]
+    x = y = shelf = 0
+    for key, surf in sorted(frames, key=lambda frame: -frame[1].get_height()):
+        width, height = surf.get_size()
+        if x + width > size:
+            x, y, shelf = 0, y + shelf, 0
+        if y + height > size:
+            pages.append([])
+            x = y = shelf = 0
+        pages[-1].append((key, surf, x, y))
+        x += width
+        shelf = max(shelf, height)
+
+    packed = []
+    for page in pages:
+        width = max(x + surf.get_width() for _, surf, x, _ in page)
+        height = max(y + surf.get_height() for _, surf, _, y in page)
+        atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+        rects = {}
+        for key, surf, x, y in page:
+            # a max blend onto the empty page copies the pixels without blending
+            atlas.blit(surf, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+            rects[key] = (x, y, *surf.get_size())
+        packed.append((atlas, rects))
+    return packed
+
 
 def import_folder(path: Path):
-    return [pygame.image.load(f).convert_alpha() for f in sorted(path.iterdir())]
+    return [surf for _, surf in assets.folder(path)]
 
 
 def import_folder_dict(path: Path):
-    return {f.stem: pygame.image.load(f).convert_alpha() for f in path.iterdir()}
+    return dict(assets.folder(path))
 
 
 def import_collections(path: Path):
@@ -1,24 +1,79 @@
+from heapq import heappop, heappush
+from itertools import count
+
 import pygame
 
 
+class ManualClock:
+    def __init__(self, time=0) -> None:
+        self.time = time
+
+    def advance(self, ms):
+        self.time += ms
+
+    def __call__(self):
+        return self.time
+
+
+class Event:
+    def __init__(self, func) -> None:
+        self.func = func
+        self.deadline = None
+        self.key = None
+
+    @property
+    def pending(self):
+        return self.key is not None
+
+
+class Scheduler:
+    def __init__(self, clock=pygame.time.get_ticks) -> None:
+        # clock returns milliseconds, a ManualClock runs it headless
+        self.clock = clock
+        self.queue = []
+        self.counter = count()
+
+    def schedule(self, delay, func):
+        event = Event(func)
+        self.reschedule(event, delay)
+        return event
+
+    def reschedule(self, event, delay):
+        # the old heap entry stays behind and is skipped once its key is stale
+        event.deadline = self.clock() + delay
+        event.key = next(self.counter)
+        heappush(self.queue, (event.deadline, event.key, event))
+
+    def cancel(self, event):
+        event.key = None
+
+    def update(self):
+        now = self.clock()
+        queue = self.queue
+        while queue and queue[0][0] <= now:
+            _, key, event = heappop(queue)
+            if key == event.key:
+                event.key = None
+                event.func()
+
+
 class Timer:
-    def __init__(self, duration, func=None):
+    def __init__(self, duration, scheduler, func=None):
         self.duration = duration
+        self.scheduler = scheduler
         self.func = func
-        self.start_time = 0
-        self.active = False
+        self.event = Event(self.expire)
+
+    @property
+    def active(self):
+        return self.event.pending
 
     def activate(self):
-        self.active = True
-        self.start_time = pygame.time.get_ticks()
+        self.scheduler.reschedule(self.event, self.duration)
 
     def deactivate(self):
-        self.active = False
-        self.start_time = 0
+        self.scheduler.cancel(self.event)
 
-    def update(self):
-        current_time = pygame.time.get_ticks()
-        if self.active and current_time - self.start_time >= self.duration:
-            self.deactivate()
-            if self.func:
-                self.func()
+    def expire(self):
+        if self.func:
+            self.func()
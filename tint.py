@@ -0,0 +1,27 @@
+import pygame
+
+from settings import SCREEN_HEIGHT, SCREEN_WIDTH
+
+WHITE = (255, 255, 255)
+
+
+class Tint:
+    def __init__(self) -> None:
+        self.full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.full_color = WHITE
+        self.color = WHITE
+
+    def multiply(self, color):
+        if color != WHITE:
+            self.color = tuple(a * b // 255 for a, b in zip(self.color, color))
+
+    def display(self, queue):
+        color, self.color = self.color, WHITE
+        if color == WHITE:
+            return
+
+        # the full screen surface is only refilled when the colour moves
+        if color != self.full_color:
+            self.full_surf.fill(color)
+            self.full_color = color
+        queue.append(self.full_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
@@ -1,28 +1,24 @@
-import pygame
-
-from settings import SCREEN_HEIGHT, SCREEN_WIDTH
-
-
 class Transition:
-    def __init__(self, reset, player) -> None:
-        self.display_surface = pygame.display.get_surface()
+    def __init__(self, reset, player, tint) -> None:
         self.reset = reset
         self.player = player
+        self.tint = tint
 
-        self.image = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.color = 255
-        self.speed = -5
+        # seconds per fade, out and back in
+        self.duration = 0.85
+        self.elapsed = 0
+        self.color = (255, 255, 255)
     
-    def play(self, dt):
-        self.color += self.speed
-        if self.color <= 1:
-            self.speed *= -1
-            self.color = 0
+    def update(self, dt):
+        self.elapsed += dt
+        if self.elapsed - dt < self.duration <= self.elapsed:
             self.reset()
-        elif self.color > 255:
-            self.color = 255
-            self.speed *= -1
+        if self.elapsed >= self.duration * 2:
+            self.elapsed = 0
             self.player.sleep = False
 
-        self.image.fill((self.color, self.color, self.color))
-        self.display_surface.blit(self.image, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        value = int(255 * abs(self.elapsed - self.duration) / self.duration)
+        self.color = (value, value, value)
+
+    def display(self):
+        self.tint.multiply(self.color)